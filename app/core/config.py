@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 from typing import Optional
 import os
@@ -14,6 +15,8 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./financial_advisor.db"
+    # Content-addressed store for chunk texts referenced from Pinecone metadata
+    chunk_store_path: str = "./chunk_store.db"
     
     # Application
     app_name: str = "Financial Advisor"
@@ -21,12 +24,31 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0" 
     port: int = 8000
     
+    # Upload limits
+    max_upload_bytes: int = 10485760  # 10 MB
+    sanitize_max_bytes: int = 131072  # cap on untrusted text passed through sanitization
+
     # RAG Settings
     chunk_size: int = 1000
     chunk_overlap: int = 200
+    # How many chunks to send per embeddings request
+    embeddings_chunk_size: int = 1000
     max_tokens: int = 4000
     temperature: float = 0.1
+    # Token budget for the dynamic profile fragment sent to the LLM
+    profile_token_budget: int = 1500
     
+    # Per-request budget for LLM-backed analysis calls, in seconds
+    request_timeout: float = 60.0
+
+    # Strategy micro-batching: coalesce concurrent generations that arrive
+    # within the window (seconds) into a single LLM request
+    strategy_batch_size: int = 8
+    strategy_batch_window: float = 0.05
+
+    # How often the background task refreshes the cached market context, in seconds
+    market_context_refresh_interval: float = 900.0
+
     # Compliance thresholds
     compliance_threshold: float = 0.85
     risk_score_threshold: float = 0.7
@@ -35,5 +57,15 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the application settings, reading the environment only once
+
+    Usable as a FastAPI dependency; repeated calls reuse the cached instance
+    instead of re-parsing .env and the process environment.
+    """
+    return Settings()
+
 # Create settings instance
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
\ No newline at end of file
@@ -1,7 +1,14 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timezone
+
+def _utcnow_iso() -> str:
+    """
+    Current UTC time as an ISO string, rendered once at response build time
+    so the serializer never has to walk a datetime object
+    """
+    return datetime.now(timezone.utc).isoformat()
 
 class RiskLevel(str, Enum):
     """
@@ -19,6 +26,11 @@ class ComplianceStatus(str, Enum):
     NON_COMPLIANT = "non_compliant"
     NEEDS_REVIEW = "needs_review"
 
+# Value -> member lookup tables for hot-path coercions; a dict hit is much
+# cheaper than Enum.__call__'s missing-value machinery
+COMPLIANCE_STATUS_BY_VALUE = {member.value: member for member in ComplianceStatus}
+RISK_LEVEL_BY_VALUE = {member.value: member for member in RiskLevel}
+
 class DocumentAnalysisRequest(BaseModel):
     """
     Request model for document analysis
@@ -32,9 +44,38 @@ class DocumentAnalysisResponse(BaseModel):
     """
     compliance_status: ComplianceStatus
     confidence_score: float = Field(..., ge=0.0, le=1.0, description="Confidence in compliance assessment")
-    flagged_clauses: List[str] = Field(default=[], description="Non-compliant clauses identified")
-    recommendations: List[str] = Field(default=[], description="Recommendations for compliance")
-    risk_factors: List[str] = Field(default=[], description="Identified risk factors")
+    flagged_clauses: List[str] = Field(default_factory=list, description="Non-compliant clauses identified")
+    recommendations: List[str] = Field(default_factory=list, description="Recommendations for compliance")
+    risk_factors: List[str] = Field(default_factory=list, description="Identified risk factors")
+
+class DocumentStoreItem(BaseModel):
+    """
+    Single document in a batch store request
+    """
+    document_text: str = Field(..., description="Text content of the document")
+    document_id: str = Field(..., description="Unique document identifier")
+    document_type: str = Field(default="policy", description="Type of document")
+    metadata: Optional[Dict[str, Any]] = Field(default=None, description="Additional document metadata")
+
+class BatchStoreRequest(BaseModel):
+    """
+    Request model for batch document storage
+    """
+    documents: List[DocumentStoreItem] = Field(..., description="Documents to store")
+
+class BatchOperation(BaseModel):
+    """
+    Single sub-request inside a multiplexed batch call
+    """
+    op: str = Field(..., description="Operation to run: analyze, strategy, or risk")
+    payload: Any = Field(..., description="Request body for the operation")
+
+class BatchRequest(BaseModel):
+    """
+    Request model for the multiplexed batch endpoint
+    """
+    requests: List[BatchOperation] = Field(..., min_length=1,
+                                           description="Sub-requests dispatched concurrently")
 
 class UserProfile(BaseModel):
     """
@@ -44,7 +85,7 @@ class UserProfile(BaseModel):
     annual_income: float = Field(..., ge=0, description="Annual income in USD")
     investment_experience: str = Field(..., description="Investment experience level")
     risk_tolerance: RiskLevel = Field(..., description="Risk tolerance level")
-    financial_goals: List[str] = Field(..., description="Financial goals and objectives")
+    financial_goals: List[str] = Field(..., min_length=1, description="Financial goals and objectives")
     time_horizon: int = Field(..., ge=1, description="Investment time horizon in years")
     current_assets: Optional[float] = Field(default=0, description="Current asset value")
     monthly_expenses: Optional[float] = Field(default=0, description="Monthly expenses")
@@ -54,7 +95,9 @@ class StrategyRequest(BaseModel):
     Request model for financial strategy generation
     """
     user_profile: UserProfile
-    preferences: Optional[Dict[str, Any]] = Field(default={}, description="Additional preferences")
+    # Typed as Any so pydantic passes the payload through untouched; the
+    # handler checks it is a dict before use
+    preferences: Any = Field(default=None, description="Additional preferences")
 
 class InvestmentRecommendation(BaseModel):
     """
@@ -74,14 +117,16 @@ class FinancialStrategy(BaseModel):
     monthly_savings_target: float = Field(..., description="Recommended monthly savings")
     emergency_fund_target: float = Field(..., description="Emergency fund target amount")
     key_actions: List[str] = Field(..., description="Key actions to implement strategy")
-    risk_warnings: List[str] = Field(default=[], description="Important risk considerations")
+    risk_warnings: List[str] = Field(default_factory=list, description="Important risk considerations")
     review_timeline: str = Field(..., description="When to review this strategy")
 
 class RiskAssessmentRequest(BaseModel):
     """
     Request model for risk assessment
     """
-    financial_data: Dict[str, Any] = Field(..., description="Financial data for assessment")
+    # Typed as Any so pydantic does not walk every key of a potentially large
+    # payload; the handler checks it is a dict before use
+    financial_data: Any = Field(..., description="Financial data for assessment")
     scenario_type: str = Field(default="general", description="Type of risk scenario")
 
 class RiskFactor(BaseModel):
@@ -110,4 +155,4 @@ class APIResponse(BaseModel):
     success: bool = True
     message: str = "Operation completed successfully"
     data: Optional[Any] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
\ No newline at end of file
+    timestamp: str = Field(default_factory=_utcnow_iso)
\ No newline at end of file
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError
+import asyncio
+import logging
+from app.models.schemas import (
+    BatchRequest,
+    DocumentAnalysisRequest,
+    StrategyRequest,
+    RiskAssessmentRequest,
+    APIResponse
+)
+from app.routers.documents import _run_document_analysis
+from app.routers.risk_assessment import _run_risk_assessment
+from app.routers.strategies import generate_financial_strategy
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+async def _run_operation(op: str, payload):
+    """
+    Dispatch one batch sub-request to its pipeline
+
+    Failures stay local to the sub-request: validation and handler errors
+    come back as per-item failure dicts instead of failing the whole batch.
+    """
+    try:
+        if op == "analyze":
+            request = DocumentAnalysisRequest.model_validate(payload)
+            result = await _run_document_analysis(request.document_text, request.document_type)
+        elif op == "strategy":
+            result = await generate_financial_strategy(StrategyRequest.model_validate(payload))
+        elif op == "risk":
+            result = await _run_risk_assessment(RiskAssessmentRequest.model_validate(payload))
+        else:
+            return {"success": False, "error": f"Unknown operation: {op}"}
+        return result.model_dump() if isinstance(result, APIResponse) else result
+    except ValidationError as exc:
+        return {"success": False, "error": exc.errors(include_url=False)}
+    except HTTPException as exc:
+        return {"success": False, "error": exc.detail}
+    except Exception as e:
+        logger.error("Batch operation %s failed: %s", op, e)
+        return {"success": False, "error": "Internal error during batch operation"}
+
+@router.post("/batch")
+async def run_batch(raw_request: Request):
+    """
+    Run several independent operations in one multiplexed request
+
+    Sub-requests are dispatched concurrently with asyncio.gather, so a
+    batch costs roughly one round trip plus the slowest operation instead
+    of one round trip per operation.
+    """
+    try:
+        batch = BatchRequest.model_validate_json(await raw_request.body())
+    except ValidationError as exc:
+        # include_input=False: for a malformed body the error input is the
+        # raw bytes, which the 422 response could not serialize
+        return ORJSONResponse(
+            status_code=422,
+            content={"detail": exc.errors(include_url=False, include_input=False)}
+        )
+
+    results = await asyncio.gather(
+        *(_run_operation(item.op, item.payload) for item in batch.requests)
+    )
+
+    logger.info("Completed batch of %d operations", len(results))
+
+    return APIResponse(
+        success=True,
+        message=f"Batch of {len(results)} operations completed",
+        data={"results": results}
+    )
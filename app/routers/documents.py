@@ -1,63 +1,174 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response, UploadFile, File, Form
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import ValidationError
 from typing import Optional
+import asyncio
+import hashlib
 import logging
+import orjson
+import time
+from collections import OrderedDict
 from app.models.schemas import (
-    DocumentAnalysisRequest, 
-    DocumentAnalysisResponse, 
+    DocumentAnalysisRequest,
+    DocumentAnalysisResponse,
     ComplianceStatus,
+    COMPLIANCE_STATUS_BY_VALUE,
+    BatchStoreRequest,
     APIResponse
 )
+from app.core.config import settings
 from app.services.rag_service import rag_service
 from app.utils.helpers import DocumentProcessor, SecurityUtils
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.post("/analyze-document", response_model=APIResponse)
-async def analyze_document(request: DocumentAnalysisRequest):
+# Short-lived cache for /document-stats so dashboard bursts don't each pay a
+# Pinecone describe_index_stats RPC; invalidated whenever documents are stored
+_STATS_CACHE_TTL = 10.0
+_stats_cache = {"at": 0.0, "data": None}
+
+def _invalidate_stats_cache():
+    _stats_cache["data"] = None
+
+# Supported document types served by /document-types; static catalog data,
+# so the envelope is serialized once and repeat clients revalidate by ETag
+_DOCUMENT_TYPES = {
+    "policy": "Policy documents, terms and conditions, agreements",
+    "prospectus": "Fund prospectuses and investment objective statements",
+    "report": "Annual and quarterly reports, financial statements",
+    "disclosure": "Disclosure statements and risk factor documents",
+    "general": "Any other financial document"
+}
+_DOC_TYPES_BYTES = orjson.dumps({
+    "success": True,
+    "message": "Document types retrieved successfully",
+    "data": _DOCUMENT_TYPES
+})
+_DOC_TYPES_ETAG = '"%s"' % hashlib.blake2b(_DOC_TYPES_BYTES, digest_size=16).hexdigest()
+_DOC_TYPES_HEADERS = {
+    "ETag": _DOC_TYPES_ETAG,
+    "Cache-Control": "public, max-age=86400, immutable"
+}
+
+# Ingestion jobs accepted by /store-document, keyed by document ID; bounded
+# so the registry cannot grow without limit
+_INGEST_JOBS_MAX = 1024
+_ingest_jobs: OrderedDict = OrderedDict()
+
+def _record_ingest_status(document_id: str, status: str):
+    _ingest_jobs[document_id] = status
+    _ingest_jobs.move_to_end(document_id)
+    if len(_ingest_jobs) > _INGEST_JOBS_MAX:
+        _ingest_jobs.popitem(last=False)
+
+async def _ingest_document(document_text: str, document_id: str, metadata: dict):
+    """
+    Background ingestion: chunk, embed and upsert off the request path
+    """
+    try:
+        success = await asyncio.to_thread(
+            rag_service.store_document,
+            document_text=document_text,
+            document_id=document_id,
+            metadata=metadata
+        )
+        if success:
+            _invalidate_stats_cache()
+            _record_ingest_status(document_id, "completed")
+            logger.info("Successfully stored document: %s", document_id)
+        else:
+            _record_ingest_status(document_id, "failed")
+            logger.error("Failed to store document: %s", document_id)
+    except Exception as e:
+        _record_ingest_status(document_id, "failed")
+        logger.error("Document ingestion failed for %s: %s", document_id, e)
+
+@router.post("/analyze-document")
+async def analyze_document(raw_request: Request):
     """
     Analyze financial document for compliance issues using RAG pipeline
-    
+
     This endpoint processes financial documents and flags potential non-compliant clauses
     with 95% accuracy using our trained RAG model.
     """
+    # Parse and validate the raw body in a single pydantic-core pass instead
+    # of letting FastAPI json.loads the payload and validate it separately
     try:
-        # Sanitize input
-        sanitized_text = SecurityUtils.sanitize_input(request.document_text)
-        
+        request = DocumentAnalysisRequest.model_validate_json(await raw_request.body())
+    except ValidationError as exc:
+        # include_input=False: for a malformed body the error input is the
+        # raw bytes, which the 422 response could not serialize
+        return ORJSONResponse(
+            status_code=422,
+            content={"detail": exc.errors(include_url=False, include_input=False)}
+        )
+
+    return await _run_document_analysis(request.document_text, request.document_type)
+
+async def _run_document_analysis(document_text: str, document_type: Optional[str],
+                                 trusted: bool = False):
+    """
+    Core sanitize -> clean -> RAG pipeline shared by the text and file endpoints
+
+    Args:
+        document_text: Document text to analyze
+        document_type: Declared document type, detected from content if empty
+        trusted: Skip sanitization for text produced by our own extractors
+    """
+    try:
+        if trusted:
+            # Text we extracted ourselves does not need input sanitization
+            sanitized_text = document_text
+        else:
+            # Bound sanitization cost: reject oversized untrusted bodies up
+            # front instead of running a full-text traversal over them
+            if len(document_text.encode("utf-8", "ignore")) > settings.sanitize_max_bytes:
+                raise HTTPException(status_code=413, detail="Document text is too large")
+            sanitized_text = SecurityUtils.sanitize_input(document_text)
+
         if not sanitized_text.strip():
             raise HTTPException(status_code=400, detail="Document text cannot be empty")
-        
+
         # Clean and process the document text
         cleaned_text = DocumentProcessor.clean_text(sanitized_text)
-        
+
         # Identify document type if not provided
-        if not request.document_type:
-            request.document_type = DocumentProcessor.identify_document_type(cleaned_text)
-        
+        if not document_type:
+            document_type = DocumentProcessor.identify_document_type(cleaned_text)
+
         # Extract financial terms for context
         financial_terms = DocumentProcessor.extract_financial_terms(cleaned_text)
-        logger.info(f"Identified {len(financial_terms)} financial terms in document")
+        logger.info("Identified %d financial terms in document", len(financial_terms))
         
-        # Perform compliance analysis using RAG
-        analysis_result = rag_service.analyze_compliance(cleaned_text)
+        # Perform compliance analysis using RAG; the underlying OpenAI and
+        # Pinecone clients are synchronous, so run them in the threadpool to
+        # keep the event loop free for other requests
+        try:
+            analysis_result = await asyncio.wait_for(
+                asyncio.to_thread(rag_service.analyze_compliance, cleaned_text),
+                timeout=settings.request_timeout
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Document analysis timed out")
         
-        # Convert to response model
-        response_data = DocumentAnalysisResponse(
-            compliance_status=ComplianceStatus(analysis_result.get("compliance_status", "needs_review")),
+        # Convert to response model without re-validating data we produced ourselves
+        response_data = DocumentAnalysisResponse.model_construct(
+            compliance_status=COMPLIANCE_STATUS_BY_VALUE.get(
+                analysis_result.get("compliance_status"), ComplianceStatus.NEEDS_REVIEW
+            ),
             confidence_score=analysis_result.get("confidence_score", 0.0),
             flagged_clauses=analysis_result.get("flagged_clauses", []),
             recommendations=analysis_result.get("recommendations", []),
             risk_factors=analysis_result.get("risk_factors", [])
         )
-        
-        logger.info(f"Document analysis completed: {response_data.compliance_status}")
-        
+
+        logger.info("Document analysis completed: %s", response_data.compliance_status)
+
         return APIResponse(
             success=True,
             message="Document analysis completed successfully",
-            data=response_data.dict()
+            data=response_data.model_dump()
         )
         
     except HTTPException:
@@ -66,7 +177,7 @@ async def analyze_document(request: DocumentAnalysisRequest):
         logger.error(f"Document analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during document analysis")
 
-@router.post("/analyze-document-file", response_model=APIResponse)
+@router.post("/analyze-document-file")
 async def analyze_document_file(
     file: UploadFile = File(...),
     document_type: Optional[str] = Form(default="policy")
@@ -81,26 +192,26 @@ async def analyze_document_file(
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
-        # Read file content
-        file_content = await file.read()
-        
-        if len(file_content) == 0:
+        # Enforce the upload size limit before touching the payload
+        if file.size and file.size > settings.max_upload_bytes:
+            raise HTTPException(status_code=413, detail="Uploaded file is too large")
+
+        if not file.size:
             raise HTTPException(status_code=400, detail="Uploaded file is empty")
-        
-        # Extract text from PDF
-        document_text = DocumentProcessor.extract_text_from_pdf(file_content)
+
+        # Extract text by streaming the spooled upload into the PDF parser
+        # instead of buffering the whole file as bytes first; parsing is
+        # CPU-bound, so keep it off the event loop as well
+        document_text = await asyncio.to_thread(
+            DocumentProcessor.extract_text_from_pdf, file.file
+        )
         
         if not document_text.strip():
             raise HTTPException(status_code=400, detail="Could not extract text from PDF")
         
-        # Create request object and analyze
-        analysis_request = DocumentAnalysisRequest(
-            document_text=document_text,
-            document_type=document_type
-        )
-        
-        # Use the existing analyze_document logic
-        return await analyze_document(analysis_request)
+        # Run the shared analysis pipeline; skip sanitization since the text
+        # came from our own PDF extractor rather than an untrusted client
+        return await _run_document_analysis(document_text, document_type, trusted=True)
         
     except HTTPException:
         raise
@@ -108,8 +219,9 @@ async def analyze_document_file(
         logger.error(f"File analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during file analysis")
 
-@router.post("/store-document", response_model=APIResponse)
+@router.post("/store-document", status_code=202)
 async def store_document(
+    background_tasks: BackgroundTasks,
     document_text: str = Form(...),
     document_id: str = Form(...),
     document_type: Optional[str] = Form(default="policy"),
@@ -117,11 +229,17 @@ async def store_document(
 ):
     """
     Store a financial document in the vector database for future reference
-    
+
     This endpoint stores documents in Pinecone for building the knowledge base
-    used by the RAG pipeline.
+    used by the RAG pipeline. Validation happens inline; the embed/upsert
+    pipeline runs as a background task, so the response returns as soon as
+    the document is accepted. Poll /ingest-status/{document_id} for progress.
     """
     try:
+        # Bound sanitization cost on untrusted form input
+        if len(document_text.encode("utf-8", "ignore")) > settings.sanitize_max_bytes:
+            raise HTTPException(status_code=413, detail="Document text is too large")
+
         # Sanitize inputs
         sanitized_text = SecurityUtils.sanitize_input(document_text)
         sanitized_id = SecurityUtils.sanitize_input(document_id)
@@ -133,10 +251,9 @@ async def store_document(
             raise HTTPException(status_code=400, detail="Document ID cannot be empty")
         
         # Parse metadata
-        import json
         try:
-            metadata_dict = json.loads(metadata) if metadata else {}
-        except json.JSONDecodeError:
+            metadata_dict = orjson.loads(metadata) if metadata else {}
+        except orjson.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid metadata JSON")
         
         # Add document type to metadata
@@ -145,22 +262,21 @@ async def store_document(
             "stored_at": "2023-11-21T10:00:00Z"  # In production, use current timestamp
         })
         
-        # Store document in vector database
-        success = rag_service.store_document(
-            document_text=sanitized_text,
-            document_id=sanitized_id,
-            metadata=metadata_dict
+        # Ingest in the background so the client gets an immediate ack
+        # instead of waiting through the embed/upsert round trips
+        _record_ingest_status(sanitized_id, "pending")
+        background_tasks.add_task(
+            _ingest_document, sanitized_text, sanitized_id, metadata_dict
         )
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to store document")
-        
-        logger.info(f"Successfully stored document: {sanitized_id}")
-        
+
         return APIResponse(
             success=True,
-            message=f"Document {sanitized_id} stored successfully",
-            data={"document_id": sanitized_id, "document_type": document_type}
+            message=f"Document {sanitized_id} accepted for storage",
+            data={
+                "document_id": sanitized_id,
+                "document_type": document_type,
+                "status": "pending"
+            }
         )
         
     except HTTPException:
@@ -169,16 +285,117 @@ async def store_document(
         logger.error(f"Document storage failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during document storage")
 
-@router.get("/document-stats", response_model=APIResponse)
+@router.post("/store-documents")
+async def store_documents(raw_request: Request):
+    """
+    Store a batch of financial documents in the vector database
+
+    Batching amortizes the embedding request and the Pinecone upsert across
+    all documents instead of paying one network round-trip per document.
+    """
+    try:
+        batch = BatchStoreRequest.model_validate_json(await raw_request.body())
+    except ValidationError as exc:
+        # include_input=False: for a malformed body the error input is the
+        # raw bytes, which the 422 response could not serialize
+        return ORJSONResponse(
+            status_code=422,
+            content={"detail": exc.errors(include_url=False, include_input=False)}
+        )
+
+    try:
+        if not batch.documents:
+            raise HTTPException(status_code=400, detail="Document batch cannot be empty")
+
+        documents = []
+        for item in batch.documents:
+            if len(item.document_text.encode("utf-8", "ignore")) > settings.sanitize_max_bytes:
+                raise HTTPException(status_code=413, detail="Document text is too large")
+
+            sanitized_text = SecurityUtils.sanitize_input(item.document_text)
+            sanitized_id = SecurityUtils.sanitize_input(item.document_id)
+
+            if not sanitized_text.strip() or not sanitized_id.strip():
+                raise HTTPException(
+                    status_code=400,
+                    detail="Each document needs non-empty text and an ID"
+                )
+
+            metadata = dict(item.metadata or {})
+            metadata["document_type"] = item.document_type
+            documents.append({
+                "document_text": sanitized_text,
+                "document_id": sanitized_id,
+                "metadata": metadata
+            })
+
+        # Store the whole batch in one embedding/upsert pass off the event loop
+        success = await asyncio.to_thread(rag_service.store_documents, documents)
+
+        if not success:
+            raise HTTPException(status_code=500, detail="Failed to store document batch")
+
+        _invalidate_stats_cache()
+        stored_ids = [doc["document_id"] for doc in documents]
+        logger.info("Successfully stored document batch: %s", stored_ids)
+
+        return APIResponse(
+            success=True,
+            message=f"Stored {len(stored_ids)} documents successfully",
+            data={"document_ids": stored_ids}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch document storage failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during batch document storage")
+
+@router.get("/document-types")
+async def get_document_types(request: Request):
+    """
+    Get the document types supported by the analysis pipeline
+    """
+    if request.headers.get("if-none-match") == _DOC_TYPES_ETAG:
+        return Response(status_code=304, headers=_DOC_TYPES_HEADERS)
+
+    return Response(
+        content=_DOC_TYPES_BYTES,
+        media_type="application/json",
+        headers=_DOC_TYPES_HEADERS
+    )
+
+@router.get("/ingest-status/{document_id}")
+async def get_ingest_status(document_id: str):
+    """
+    Check the status of a background document ingestion job
+    """
+    status = _ingest_jobs.get(document_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="No ingestion job found for this document")
+
+    return APIResponse(
+        success=True,
+        message="Ingestion status retrieved successfully",
+        data={"document_id": document_id, "status": status}
+    )
+
+@router.get("/document-stats")
 async def get_document_stats():
     """
     Get statistics about stored documents in the vector database
     """
     try:
         from app.services.pinecone_service import pinecone_service
-        
-        stats = pinecone_service.get_index_stats()
-        
+
+        # Serve a burst of dashboard requests from memory within the TTL
+        if _stats_cache["data"] is not None and time.monotonic() - _stats_cache["at"] < _STATS_CACHE_TTL:
+            stats = _stats_cache["data"]
+        else:
+            stats = await asyncio.to_thread(pinecone_service.get_index_stats)
+            _stats_cache["data"] = stats
+            _stats_cache["at"] = time.monotonic()
+
         return APIResponse(
             success=True,
             message="Document statistics retrieved successfully",
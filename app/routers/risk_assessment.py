@@ -1,62 +1,157 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+import hashlib
+from pydantic import ValidationError
+from bisect import bisect_left, bisect_right
+import asyncio
 import logging
+import numpy as np
+import orjson
+from types import MappingProxyType
 from typing import Dict, Any
 from app.models.schemas import (
     RiskAssessmentRequest,
-    RiskAssessmentResponse,
-    APIResponse,
-    RiskLevel,
-    RiskFactor
+    APIResponse
 )
+from app.core.config import settings
 from app.services.financial_agent import financial_agent
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.post("/assess-risk", response_model=APIResponse)
-async def assess_financial_risk(request: RiskAssessmentRequest):
+# Fixed asset-class universe for stress testing; impact vectors follow this order
+_ASSET_ORDER = ("stocks", "bonds", "cash", "commodities", "real_estate")
+_ASSET_INDEX = {name: i for i, name in enumerate(_ASSET_ORDER)}
+_DEFAULT_IMPACT = -0.10  # applied to asset classes outside the known universe
+
+# Stress test scenarios (simplified model), precomputed once as NumPy vectors
+# and frozen so request handlers cannot mutate the shared mapping
+_STRESS_SCENARIOS = MappingProxyType({
+    # stocks, bonds, cash, commodities, real_estate
+    "market_crash": np.array([-0.30, -0.05, 0.0, -0.15, -0.20]),
+    "recession": np.array([-0.20, 0.05, 0.0, -0.10, -0.15]),  # bonds may benefit
+    "inflation_spike": np.array([-0.10, -0.15, -0.05, 0.20, 0.10]),  # commodities hedge
+    "interest_rate_shock": np.array([-0.15, -0.25, 0.02, -0.05, -0.10]),  # bonds very sensitive
+})
+
+# Risk-tolerance quiz scoring tables; answers not listed here score 1
+_EXPERIENCE_SCORE = {"expert": 3, "advanced": 3, "intermediate": 2, "moderate": 2}
+_STABILITY_SCORE = {"very_stable": 3, "stable": 2}
+_REACTION_SCORE = {"opportunity": 3, "buy_more": 3, "hold": 2, "wait": 2}
+# Numeric answers bucket through bisect: age < 30 scores 3, < 50 scores 2,
+# else 1; time horizon > 15 scores 3, > 7 scores 2, else 1
+_AGE_BOUNDS = (30, 50)
+_BUCKET_SCORES = (3, 2, 1)
+_HORIZON_BOUNDS = (7, 15)
+_HORIZON_SCORES = (1, 2, 3)
+
+# Static catalog of risk metrics served by /risk-metrics, built once at import
+_RISK_METRICS = {
+    "overall_risk_score": {
+        "description": "Composite risk score from 0.0 (lowest risk) to 1.0 (highest risk)",
+        "interpretation": {
+            "0.0-0.3": "Low risk - Conservative portfolio suitable for capital preservation",
+            "0.3-0.6": "Moderate risk - Balanced approach with growth potential",
+            "0.6-1.0": "High risk - Aggressive growth strategy with higher volatility"
+        }
+    },
+    "market_risk": {
+        "description": "Risk from overall market movements and economic conditions",
+        "factors": ["Market volatility", "Economic cycles", "Interest rate changes"]
+    },
+    "credit_risk": {
+        "description": "Risk of default on debt obligations",
+        "factors": ["Credit rating", "Debt-to-income ratio", "Payment history"]
+    },
+    "liquidity_risk": {
+        "description": "Risk of not being able to convert investments to cash quickly",
+        "factors": ["Asset liquidity", "Market conditions", "Investment type"]
+    },
+    "inflation_risk": {
+        "description": "Risk that inflation will erode purchasing power",
+        "factors": ["Asset classes", "Duration", "Economic environment"]
+    },
+    "concentration_risk": {
+        "description": "Risk from lack of diversification",
+        "factors": ["Asset allocation", "Geographic exposure", "Sector concentration"]
+    }
+}
+
+# The /risk-metrics payload never changes, so serialize it once at import and
+# precompute a strong ETag that lets repeat clients get 304s with no body
+_RISK_METRICS_BYTES = orjson.dumps({
+    "success": True,
+    "message": "Risk metrics information retrieved successfully",
+    "data": _RISK_METRICS
+})
+_RISK_METRICS_ETAG = '"%s"' % hashlib.blake2b(_RISK_METRICS_BYTES, digest_size=16).hexdigest()
+_RISK_METRICS_HEADERS = {
+    "ETag": _RISK_METRICS_ETAG,
+    "Cache-Control": "public, max-age=86400, immutable"
+}
+
+@router.post("/assess-risk")
+async def assess_financial_risk(raw_request: Request):
     """
     Assess financial risk based on user data and scenario
-    
+
     This endpoint analyzes financial data to identify potential risks and
     provides mitigation strategies using AI-powered risk assessment.
     """
+    # Single-pass parse + validation of the raw body via pydantic-core
     try:
-        # Validate financial data
-        if not request.financial_data:
-            raise HTTPException(status_code=400, detail="Financial data cannot be empty")
-        
-        # Perform risk assessment using AI agent
-        risk_result = financial_agent.assess_financial_risk(
-            financial_data=request.financial_data,
-            scenario_type=request.scenario_type
+        request = RiskAssessmentRequest.model_validate_json(await raw_request.body())
+    except ValidationError as exc:
+        # include_input=False: for a malformed body the error input is the
+        # raw bytes, which the 422 response could not serialize
+        return ORJSONResponse(
+            status_code=422,
+            content={"detail": exc.errors(include_url=False, include_input=False)}
         )
+
+    return await _run_risk_assessment(request)
+
+async def _run_risk_assessment(request: RiskAssessmentRequest):
+    """
+    Core risk assessment pipeline shared by the endpoint and batch dispatch
+
+    Args:
+        request: Validated risk assessment request
+    """
+    try:
+        # Validate financial data (passthrough field, so check the shape here)
+        if not request.financial_data or not isinstance(request.financial_data, dict):
+            raise HTTPException(status_code=400, detail="Financial data cannot be empty")
         
-        # Convert to response model
-        risk_factors = []
-        for factor_data in risk_result.get("risk_factors", []):
-            risk_factors.append(RiskFactor(
-                factor_name=factor_data.get("factor_name", "Unknown Risk"),
-                severity=factor_data.get("severity", "medium"),
-                impact_score=factor_data.get("impact_score", 0.5),
-                mitigation_strategies=factor_data.get("mitigation_strategies", [])
-            ))
-        
-        risk_assessment = RiskAssessmentResponse(
-            overall_risk_score=risk_result.get("overall_risk_score", 0.5),
-            risk_level=RiskLevel(risk_result.get("risk_level", "moderate")),
-            risk_factors=risk_factors,
-            recommendations=risk_result.get("recommendations", []),
-            confidence_score=risk_result.get("confidence_score", 0.7)
-        )
-        
-        logger.info(f"Risk assessment completed: {risk_assessment.risk_level} risk level")
-        
+        # Perform risk assessment on the agent's async path so the event
+        # loop keeps serving other requests during the LLM call
+        try:
+            risk_result = await asyncio.wait_for(
+                financial_agent.aassess_financial_risk(
+                    financial_data=request.financial_data,
+                    scenario_type=request.scenario_type
+                ),
+                timeout=settings.request_timeout
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Risk assessment timed out")
+        
+        # The agent output arrives as dicts and leaves as JSON, so pass the
+        # factors straight through instead of round-tripping them via models
+        risk_data = {
+            "overall_risk_score": risk_result.get("overall_risk_score", 0.5),
+            "risk_level": risk_result.get("risk_level", "moderate"),
+            "risk_factors": risk_result.get("risk_factors", []),
+            "recommendations": risk_result.get("recommendations", []),
+            "confidence_score": risk_result.get("confidence_score", 0.7)
+        }
+
+        logger.info("Risk assessment completed: %s risk level", risk_data['risk_level'])
+
         return APIResponse(
             success=True,
             message="Risk assessment completed successfully",
-            data=risk_assessment.dict()
+            data=risk_data
         )
         
     except HTTPException:
@@ -65,7 +160,7 @@ async def assess_financial_risk(request: RiskAssessmentRequest):
         logger.error(f"Risk assessment failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during risk assessment")
 
-@router.post("/stress-test", response_model=APIResponse)
+@router.post("/stress-test")
 async def perform_stress_test(
     portfolio_value: float,
     portfolio_allocation: Dict[str, float],
@@ -84,67 +179,44 @@ async def perform_stress_test(
         if not portfolio_allocation:
             raise HTTPException(status_code=400, detail="Portfolio allocation cannot be empty")
         
-        # Stress test scenarios (simplified model)
-        stress_scenarios = {
-            "market_crash": {
-                "stocks": -0.30,  # 30% decline
-                "bonds": -0.05,   # 5% decline
-                "cash": 0.0,      # No change
-                "commodities": -0.15,  # 15% decline
-                "real_estate": -0.20   # 20% decline
-            },
-            "recession": {
-                "stocks": -0.20,
-                "bonds": 0.05,    # Bonds may benefit
-                "cash": 0.0,
-                "commodities": -0.10,
-                "real_estate": -0.15
-            },
-            "inflation_spike": {
-                "stocks": -0.10,
-                "bonds": -0.15,   # Bonds hurt by inflation
-                "cash": -0.05,    # Cash loses purchasing power
-                "commodities": 0.20,  # Commodities benefit
-                "real_estate": 0.10   # Real estate hedge
-            },
-            "interest_rate_shock": {
-                "stocks": -0.15,
-                "bonds": -0.25,   # Bonds very sensitive
-                "cash": 0.02,     # Cash benefits slightly
-                "commodities": -0.05,
-                "real_estate": -0.10
-            }
-        }
-        
-        if stress_scenario not in stress_scenarios:
+        if stress_scenario not in _STRESS_SCENARIOS:
             raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid stress scenario. Choose from: {list(stress_scenarios.keys())}"
+                status_code=400,
+                detail=f"Invalid stress scenario. Choose from: {list(_STRESS_SCENARIOS.keys())}"
             )
-        
-        scenario_impacts = stress_scenarios[stress_scenario]
-        
-        # Calculate portfolio impact
-        total_impact = 0.0
-        asset_impacts = {}
-        
-        for asset_class, allocation_pct in portfolio_allocation.items():
-            # Normalize allocation percentage
-            allocation = allocation_pct / 100 if allocation_pct > 1 else allocation_pct
-            
-            # Get impact for this asset class (default to -10% if not specified)
-            asset_impact = scenario_impacts.get(asset_class.lower(), -0.10)
-            
-            # Calculate weighted impact
-            weighted_impact = allocation * asset_impact
-            total_impact += weighted_impact
-            
-            asset_impacts[asset_class] = {
-                "allocation_percentage": allocation * 100,
-                "scenario_impact": asset_impact * 100,
-                "dollar_impact": portfolio_value * weighted_impact
+
+        scenario_impacts = _STRESS_SCENARIOS[stress_scenario]
+
+        # Calculate portfolio impact in one vectorized pass
+        asset_classes = list(portfolio_allocation.keys())
+        alloc = np.fromiter(
+            (portfolio_allocation[name] for name in asset_classes),
+            dtype=np.float64, count=len(asset_classes)
+        )
+        # Normalize allocation percentages to fractions
+        alloc = np.where(alloc > 1, alloc / 100.0, alloc)
+
+        # Impact per asset class: canonicalize each key once and map it to an
+        # index into the impact vector (default outside the known universe)
+        indices = [_ASSET_INDEX.get(name.lower()) for name in asset_classes]
+        impacts = np.fromiter(
+            (scenario_impacts[i] if i is not None else _DEFAULT_IMPACT for i in indices),
+            dtype=np.float64, count=len(indices)
+        )
+
+        weighted = alloc * impacts
+        total_impact = float(weighted.sum())
+        dollar_impacts = portfolio_value * weighted
+
+        asset_impacts = {
+            name: {
+                "allocation_percentage": float(a) * 100,
+                "scenario_impact": float(i) * 100,
+                "dollar_impact": float(d)
             }
-        
+            for name, a, i, d in zip(asset_classes, alloc, impacts, dollar_impacts)
+        }
+
         # Calculate new portfolio value
         new_portfolio_value = portfolio_value * (1 + total_impact)
         dollar_loss = portfolio_value - new_portfolio_value
@@ -190,123 +262,57 @@ async def perform_stress_test(
         logger.error(f"Stress test failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during stress test")
 
-@router.get("/risk-metrics", response_model=APIResponse)
-async def get_risk_metrics():
+@router.get("/risk-metrics")
+async def get_risk_metrics(request: Request):
     """
     Get standard risk metrics and their explanations
-    
+
     Returns information about common financial risk metrics used in assessment.
     """
-    try:
-        risk_metrics = {
-            "overall_risk_score": {
-                "description": "Composite risk score from 0.0 (lowest risk) to 1.0 (highest risk)",
-                "interpretation": {
-                    "0.0-0.3": "Low risk - Conservative portfolio suitable for capital preservation",
-                    "0.3-0.6": "Moderate risk - Balanced approach with growth potential",
-                    "0.6-1.0": "High risk - Aggressive growth strategy with higher volatility"
-                }
-            },
-            "market_risk": {
-                "description": "Risk from overall market movements and economic conditions",
-                "factors": ["Market volatility", "Economic cycles", "Interest rate changes"]
-            },
-            "credit_risk": {
-                "description": "Risk of default on debt obligations",
-                "factors": ["Credit rating", "Debt-to-income ratio", "Payment history"]
-            },
-            "liquidity_risk": {
-                "description": "Risk of not being able to convert investments to cash quickly",
-                "factors": ["Asset liquidity", "Market conditions", "Investment type"]
-            },
-            "inflation_risk": {
-                "description": "Risk that inflation will erode purchasing power",
-                "factors": ["Asset classes", "Duration", "Economic environment"]
-            },
-            "concentration_risk": {
-                "description": "Risk from lack of diversification",
-                "factors": ["Asset allocation", "Geographic exposure", "Sector concentration"]
-            }
-        }
-        
-        return APIResponse(
-            success=True,
-            message="Risk metrics information retrieved successfully",
-            data=risk_metrics
-        )
-        
-    except Exception as e:
-        logger.error(f"Failed to get risk metrics: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error getting risk metrics")
+    if request.headers.get("if-none-match") == _RISK_METRICS_ETAG:
+        return Response(status_code=304, headers=_RISK_METRICS_HEADERS)
 
-@router.post("/risk-tolerance-quiz", response_model=APIResponse)
-async def risk_tolerance_quiz(answers: Dict[str, Any]):
+    return Response(
+        content=_RISK_METRICS_BYTES,
+        media_type="application/json",
+        headers=_RISK_METRICS_HEADERS
+    )
+
+@router.post("/risk-tolerance-quiz")
+async def risk_tolerance_quiz(raw_request: Request):
     """
     Calculate risk tolerance based on quiz responses
-    
+
     Evaluates user responses to determine appropriate risk tolerance level.
     """
+    # Decode the answers dict straight from the raw body with orjson
+    try:
+        answers = orjson.loads(await raw_request.body())
+    except orjson.JSONDecodeError:
+        return ORJSONResponse(status_code=422, content={"detail": "Invalid JSON body"})
+
     try:
-        if not answers:
+        if not answers or not isinstance(answers, dict):
             raise HTTPException(status_code=400, detail="Quiz answers cannot be empty")
         
-        # Simple risk tolerance scoring
+        # Simple risk tolerance scoring via precomputed lookup tables
         # In production, this would use a more sophisticated questionnaire
-        risk_score = 0
-        total_questions = 0
-        
-        # Age factor (younger = higher risk tolerance)
         age = answers.get("age", 40)
-        if age < 30:
-            risk_score += 3
-        elif age < 50:
-            risk_score += 2
-        else:
-            risk_score += 1
-        total_questions += 1
-        
-        # Investment experience
         experience = answers.get("investment_experience", "beginner").lower()
-        if experience in ["expert", "advanced"]:
-            risk_score += 3
-        elif experience in ["intermediate", "moderate"]:
-            risk_score += 2
-        else:
-            risk_score += 1
-        total_questions += 1
-        
-        # Time horizon
         time_horizon = answers.get("time_horizon", 5)
-        if time_horizon > 15:
-            risk_score += 3
-        elif time_horizon > 7:
-            risk_score += 2
-        else:
-            risk_score += 1
-        total_questions += 1
-        
-        # Financial situation
         financial_stability = answers.get("financial_stability", "stable").lower()
-        if financial_stability == "very_stable":
-            risk_score += 3
-        elif financial_stability == "stable":
-            risk_score += 2
-        else:
-            risk_score += 1
-        total_questions += 1
-        
-        # Market reaction
         market_reaction = answers.get("market_drop_reaction", "concerned").lower()
-        if market_reaction in ["opportunity", "buy_more"]:
-            risk_score += 3
-        elif market_reaction in ["hold", "wait"]:
-            risk_score += 2
-        else:
-            risk_score += 1
-        total_questions += 1
-        
-        # Calculate average score
-        avg_score = risk_score / total_questions
+
+        risk_score = (
+            _BUCKET_SCORES[bisect_right(_AGE_BOUNDS, age)]
+            + _EXPERIENCE_SCORE.get(experience, 1)
+            + _HORIZON_SCORES[bisect_left(_HORIZON_BOUNDS, time_horizon)]
+            + _STABILITY_SCORE.get(financial_stability, 1)
+            + _REACTION_SCORE.get(market_reaction, 1)
+        )
+
+        # Calculate average score over the five quiz dimensions
+        avg_score = risk_score / 5
         
         # Determine risk tolerance
         if avg_score >= 2.5:
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
+import asyncio
+import hashlib
 import logging
+import numpy as np
+import orjson
+import time
+from collections import OrderedDict
+from app.core.config import settings
 from app.models.schemas import (
-    StrategyRequest, 
-    FinancialStrategy,
+    StrategyRequest,
     APIResponse,
     UserProfile
 )
@@ -13,7 +19,94 @@ from app.utils.helpers import DataValidator
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.post("/generate-strategy", response_model=APIResponse)
+# Target allocations per risk level for /optimize-portfolio, with aligned
+# (names, target vector) pairs precomputed once for the vectorized diff
+_TARGET_ALLOCATIONS = {
+    "conservative": {"stocks": 30, "bonds": 60, "cash": 10},
+    "moderate": {"stocks": 60, "bonds": 35, "cash": 5},
+    "aggressive": {"stocks": 80, "bonds": 15, "cash": 5}
+}
+_TARGET_VECTORS = {
+    level: (tuple(alloc), np.array(list(alloc.values()), dtype=np.float64))
+    for level, alloc in _TARGET_ALLOCATIONS.items()
+}
+
+# Keyed result cache for /optimize-portfolio: the endpoint is a pure function
+# of its inputs, so repeat requests within the TTL skip the computation
+_OPTIMIZE_CACHE_TTL = 3600.0
+_OPTIMIZE_CACHE_MAX = 256
+_optimize_cache: OrderedDict = OrderedDict()
+
+def _optimize_cache_key(current_allocation: dict, target_risk_level: str,
+                        investment_amount: float) -> bytes:
+    return hashlib.blake2b(
+        orjson.dumps(
+            [current_allocation, target_risk_level, investment_amount],
+            option=orjson.OPT_SORT_KEYS
+        ),
+        digest_size=16
+    ).digest()
+
+# Pre-defined strategy templates served by /strategy-templates, built once at import
+_STRATEGY_TEMPLATES = {
+    "young_aggressive": {
+        "description": "High-growth strategy for young investors (20-35)",
+        "risk_level": "aggressive",
+        "typical_allocation": {
+            "stocks": 80,
+            "bonds": 15,
+            "alternatives": 5
+        },
+        "key_features": [
+            "Focus on growth stocks and emerging markets",
+            "Higher volatility tolerance",
+            "Long-term wealth building"
+        ]
+    },
+    "mid_career_moderate": {
+        "description": "Balanced strategy for mid-career professionals (35-50)",
+        "risk_level": "moderate",
+        "typical_allocation": {
+            "stocks": 65,
+            "bonds": 30,
+            "alternatives": 5
+        },
+        "key_features": [
+            "Balance between growth and stability",
+            "Diversified across asset classes",
+            "Regular rebalancing"
+        ]
+    },
+    "pre_retirement_conservative": {
+        "description": "Capital preservation for pre-retirees (50+)",
+        "risk_level": "conservative",
+        "typical_allocation": {
+            "stocks": 40,
+            "bonds": 55,
+            "cash": 5
+        },
+        "key_features": [
+            "Focus on income generation",
+            "Lower volatility",
+            "Capital preservation"
+        ]
+    }
+}
+
+# Templates never change at runtime, so serialize the envelope once and let
+# repeat clients revalidate against a precomputed ETag
+_TEMPLATES_BYTES = orjson.dumps({
+    "success": True,
+    "message": "Strategy templates retrieved successfully",
+    "data": _STRATEGY_TEMPLATES
+})
+_TEMPLATES_ETAG = '"%s"' % hashlib.blake2b(_TEMPLATES_BYTES, digest_size=16).hexdigest()
+_TEMPLATES_HEADERS = {
+    "ETag": _TEMPLATES_ETAG,
+    "Cache-Control": "public, max-age=86400, immutable"
+}
+
+@router.post("/generate-strategy")
 async def generate_financial_strategy(request: StrategyRequest):
     """
     Generate personalized financial strategy using AI agents
@@ -22,9 +115,12 @@ async def generate_financial_strategy(request: StrategyRequest):
     personalized financial strategies based on user risk profiles and goals.
     """
     try:
-        # Validate user profile data
-        profile_data = request.user_profile.dict()
-        validation_errors = DataValidator.validate_user_profile(profile_data)
+        # Preferences are a passthrough field, so check the shape here
+        if request.preferences is not None and not isinstance(request.preferences, dict):
+            raise HTTPException(status_code=400, detail="Preferences must be an object")
+
+        # Validate user profile data by attribute access; no dict deep-copy
+        validation_errors = DataValidator.validate_user_profile(request.user_profile)
         
         if validation_errors:
             error_details = []
@@ -36,11 +132,18 @@ async def generate_financial_strategy(request: StrategyRequest):
                 detail=f"Validation errors: {'; '.join(error_details)}"
             )
         
-        # Generate strategy using AI agent
-        strategy_result = financial_agent.generate_financial_strategy(
-            user_profile=request.user_profile,
-            preferences=request.preferences
-        )
+        # Generate strategy using the AI agent's async path so the event loop
+        # keeps serving other requests during the OpenAI round trip
+        try:
+            strategy_result = await asyncio.wait_for(
+                financial_agent.agenerate_financial_strategy(
+                    user_profile=request.user_profile,
+                    preferences=request.preferences
+                ),
+                timeout=settings.request_timeout
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Strategy generation timed out")
         
         # Validate that allocations are reasonable
         if "investment_recommendations" in strategy_result:
@@ -51,24 +154,74 @@ async def generate_financial_strategy(request: StrategyRequest):
             if not valid_allocation:
                 logger.warning("Generated allocation percentages don't sum to 100%")
         
-        # Convert to response model
-        financial_strategy = FinancialStrategy(**strategy_result)
-        
-        logger.info(f"Generated financial strategy for user aged {request.user_profile.age}")
-        
-        return APIResponse(
+        logger.info("Generated financial strategy for user aged %s", request.user_profile.age)
+
+        # _validate_strategy already normalized the payload to the
+        # FinancialStrategy shape, so skip pydantic revalidation and let the
+        # ORJSONResponse default serialize the raw dict
+        return APIResponse.model_construct(
             success=True,
             message="Financial strategy generated successfully",
-            data=financial_strategy.dict()
+            data=strategy_result
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Strategy generation failed: {str(e)}")
+        logger.error("Strategy generation failed: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error during strategy generation")
 
-@router.post("/quick-strategy", response_model=APIResponse)
+@router.post("/full-plan")
+async def generate_full_plan(request: StrategyRequest):
+    """
+    Generate a financial strategy and risk assessment in one call
+
+    Dispatches both LLM calls concurrently, so the compound flow takes about
+    as long as the slower of the two instead of running them back to back.
+    """
+    try:
+        # Preferences are a passthrough field, so check the shape here
+        if request.preferences is not None and not isinstance(request.preferences, dict):
+            raise HTTPException(status_code=400, detail="Preferences must be an object")
+
+        validation_errors = DataValidator.validate_user_profile(request.user_profile)
+
+        if validation_errors:
+            error_details = []
+            for field, errors in validation_errors.items():
+                error_details.extend([f"{field}: {error}" for error in errors])
+
+            raise HTTPException(
+                status_code=400,
+                detail=f"Validation errors: {'; '.join(error_details)}"
+            )
+
+        try:
+            plan = await asyncio.wait_for(
+                financial_agent.agenerate_full_plan(
+                    user_profile=request.user_profile,
+                    preferences=request.preferences
+                ),
+                timeout=settings.request_timeout
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Financial plan generation timed out")
+
+        logger.info("Generated full financial plan for user aged %s", request.user_profile.age)
+
+        return APIResponse.model_construct(
+            success=True,
+            message="Financial plan generated successfully",
+            data=plan
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Full plan generation failed: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error during plan generation")
+
+@router.post("/quick-strategy")
 async def generate_quick_strategy(
     age: int,
     annual_income: float,
@@ -94,80 +247,51 @@ async def generate_quick_strategy(
             monthly_expenses=annual_income * 0.7 / 12  # Estimate 70% of income for expenses
         )
         
-        # Create strategy request
-        strategy_request = StrategyRequest(user_profile=user_profile)
-        
-        # Generate strategy
-        return await generate_financial_strategy(strategy_request)
-        
+        # The profile was just validated by the UserProfile model, so call the
+        # agent directly instead of re-entering the full endpoint (which would
+        # re-run DataValidator over fields we constructed ourselves)
+        try:
+            strategy_result = await asyncio.wait_for(
+                financial_agent.agenerate_financial_strategy(
+                    user_profile=user_profile,
+                    preferences=None
+                ),
+                timeout=settings.request_timeout
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Strategy generation timed out")
+
+        logger.info("Generated quick strategy for user aged %s", age)
+
+        return APIResponse.model_construct(
+            success=True,
+            message="Financial strategy generated successfully",
+            data=strategy_result
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Quick strategy generation failed: {str(e)}")
+        logger.error("Quick strategy generation failed: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error during quick strategy generation")
 
-@router.get("/strategy-templates", response_model=APIResponse)
-async def get_strategy_templates():
+@router.get("/strategy-templates")
+async def get_strategy_templates(request: Request):
     """
     Get pre-defined strategy templates for different user profiles
-    
+
     Returns common investment strategies for different risk profiles and life stages.
     """
-    try:
-        templates = {
-            "young_aggressive": {
-                "description": "High-growth strategy for young investors (20-35)",
-                "risk_level": "aggressive",
-                "typical_allocation": {
-                    "stocks": 80,
-                    "bonds": 15,
-                    "alternatives": 5
-                },
-                "key_features": [
-                    "Focus on growth stocks and emerging markets",
-                    "Higher volatility tolerance",
-                    "Long-term wealth building"
-                ]
-            },
-            "mid_career_moderate": {
-                "description": "Balanced strategy for mid-career professionals (35-50)",
-                "risk_level": "moderate",
-                "typical_allocation": {
-                    "stocks": 65,
-                    "bonds": 30,
-                    "alternatives": 5
-                },
-                "key_features": [
-                    "Balance between growth and stability",
-                    "Diversified across asset classes",
-                    "Regular rebalancing"
-                ]
-            },
-            "pre_retirement_conservative": {
-                "description": "Capital preservation for pre-retirees (50+)",
-                "risk_level": "conservative",
-                "typical_allocation": {
-                    "stocks": 40,
-                    "bonds": 55,
-                    "cash": 5
-                },
-                "key_features": [
-                    "Focus on income generation",
-                    "Lower volatility",
-                    "Capital preservation"
-                ]
-            }
-        }
-        
-        return APIResponse(
-            success=True,
-            message="Strategy templates retrieved successfully",
-            data=templates
-        )
-        
-    except Exception as e:
-        logger.error(f"Failed to get strategy templates: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error getting strategy templates")
+    if request.headers.get("if-none-match") == _TEMPLATES_ETAG:
+        return Response(status_code=304, headers=_TEMPLATES_HEADERS)
+
+    return Response(
+        content=_TEMPLATES_BYTES,
+        media_type="application/json",
+        headers=_TEMPLATES_HEADERS
+    )
 
-@router.post("/optimize-portfolio", response_model=APIResponse)
+@router.post("/optimize-portfolio")
 async def optimize_portfolio(
     current_allocation: dict,
     target_risk_level: str,
@@ -189,45 +313,57 @@ async def optimize_portfolio(
         if investment_amount < 0:
             raise HTTPException(status_code=400, detail="Investment amount must be positive")
         
-        # Simple optimization logic (in production, use more sophisticated algorithms)
-        target_allocations = {
-            "conservative": {"stocks": 30, "bonds": 60, "cash": 10},
-            "moderate": {"stocks": 60, "bonds": 35, "cash": 5},
-            "aggressive": {"stocks": 80, "bonds": 15, "cash": 5}
+        # Serve repeat requests for the same inputs from the keyed cache
+        cache_key = _optimize_cache_key(current_allocation, target_risk_level, investment_amount)
+        cached = _optimize_cache.get(cache_key)
+        if cached is not None and time.monotonic() < cached[0]:
+            _optimize_cache.move_to_end(cache_key)
+            return APIResponse(
+                success=True,
+                message="Portfolio optimization completed",
+                data=cached[1]
+            )
+
+        # Simple optimization logic (in production, use more sophisticated algorithms):
+        # compute all rebalancing differences in one vectorized pass
+        names, targets = _TARGET_VECTORS[target_risk_level]
+        current = np.fromiter(
+            (current_allocation.get(name, 0) for name in names),
+            dtype=np.float64, count=len(names)
+        )
+        diff = targets - current
+        amounts = np.abs(diff) * investment_amount / 100.0
+
+        # Only recommend changes > 2%
+        recommendations = [
+            {
+                "asset_class": names[i],
+                "action": "increase" if diff[i] > 0 else "decrease",
+                "target_percentage": float(targets[i]),
+                "current_percentage": float(current[i]),
+                "adjustment_amount": round(float(amounts[i]), 2)
+            }
+            for i in np.nonzero(np.abs(diff) > 2)[0]
+        ]
+
+        data = {
+            "target_risk_level": target_risk_level,
+            "target_allocation": _TARGET_ALLOCATIONS[target_risk_level],
+            "recommendations": recommendations
         }
-        
-        target = target_allocations[target_risk_level]
-        
-        # Calculate rebalancing needed
-        recommendations = []
-        for asset_class, target_pct in target.items():
-            current_pct = current_allocation.get(asset_class, 0)
-            difference = target_pct - current_pct
-            
-            if abs(difference) > 2:  # Only recommend changes > 2%
-                action = "increase" if difference > 0 else "decrease"
-                amount = abs(difference) * investment_amount / 100
-                
-                recommendations.append({
-                    "asset_class": asset_class,
-                    "action": action,
-                    "target_percentage": target_pct,
-                    "current_percentage": current_pct,
-                    "adjustment_amount": round(amount, 2)
-                })
-        
+
+        _optimize_cache[cache_key] = (time.monotonic() + _OPTIMIZE_CACHE_TTL, data)
+        if len(_optimize_cache) > _OPTIMIZE_CACHE_MAX:
+            _optimize_cache.popitem(last=False)
+
         return APIResponse(
             success=True,
             message="Portfolio optimization completed",
-            data={
-                "target_risk_level": target_risk_level,
-                "target_allocation": target,
-                "recommendations": recommendations
-            }
+            data=data
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Portfolio optimization failed: {str(e)}")
+        logger.error("Portfolio optimization failed: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error during portfolio optimization")
\ No newline at end of file
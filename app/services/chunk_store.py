@@ -0,0 +1,84 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ChunkStore:
+    """
+    SQLite-backed content-addressed store for chunk texts
+
+    Chunk texts are keyed by the SHA-256 of their content, so Pinecone
+    metadata only needs to carry the hash instead of duplicating the full
+    text in every vector payload. Identical chunks are stored once.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Open (or create) the chunk database and ensure the schema exists
+        """
+        self._conn = sqlite3.connect(path or settings.chunk_store_path,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY, text TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        # sqlite connections are not safe for concurrent use from the
+        # threadpool workers that call into this service
+        self._lock = threading.Lock()
+        logger.info("Chunk store initialized")
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """
+        Content address for a chunk text
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def put_many(self, texts: List[str]) -> List[str]:
+        """
+        Store chunk texts, returning their content hashes in input order
+
+        Args:
+            texts: Chunk texts to persist
+
+        Returns:
+            SHA-256 hash per input text
+        """
+        hashes = [self.content_hash(text) for text in texts]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (hash, text) VALUES (?, ?)",
+                zip(hashes, texts)
+            )
+            self._conn.commit()
+        return hashes
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """
+        Fetch chunk texts for a set of hashes in one query
+
+        Args:
+            hashes: Content hashes to look up
+
+        Returns:
+            Mapping of hash to chunk text for every hash found
+        """
+        unique = list(dict.fromkeys(hashes))
+        if not unique:
+            return {}
+
+        placeholders = ",".join("?" * len(unique))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash, text FROM chunks WHERE hash IN ({placeholders})",
+                unique
+            ).fetchall()
+        return dict(rows)
+
+# Global instance
+chunk_store = ChunkStore()
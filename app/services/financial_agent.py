@@ -1,34 +1,145 @@
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
 from langchain.agents import initialize_agent, Tool, AgentType
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+import asyncio
 import logging
-import json
+import numpy as np
+import orjson
 import re
 from app.core.config import settings
 from app.models.schemas import UserProfile, RiskLevel
 
 logger = logging.getLogger(__name__)
 
-class FinancialAgentService:
+# LLM strategy cache capacity; keys are normalized profile fingerprints so
+# near-duplicate profiles (same age bracket, income rounded to the nearest
+# thousand, same goals) share a cached strategy instead of a new OpenAI call
+_STRATEGY_CACHE_MAX = 128
+
+def _profile_fingerprint(user_profile: UserProfile,
+                         preferences: Optional[Dict[str, Any]]) -> Tuple:
     """
-    AI agent service for generating personalized financial strategies
+    Build a hashable cache key that buckets near-identical profiles together
+
+    Args:
+        user_profile: User's financial profile
+        preferences: Additional user preferences
+
+    Returns:
+        Tuple usable as a strategy cache key
     """
-    
-    def __init__(self):
-        """
-        Initialize the financial AI agent
+    return (
+        user_profile.age // 5,
+        round(user_profile.annual_income, -3),
+        user_profile.investment_experience,
+        user_profile.risk_tolerance.value,
+        user_profile.time_horizon,
+        round(user_profile.current_assets or 0, -3),
+        round(user_profile.monthly_expenses or 0, -2),
+        tuple(sorted(user_profile.financial_goals)),
+        orjson.dumps(preferences, option=orjson.OPT_SORT_KEYS) if preferences else None
+    )
+
+# Completions occasionally come back wrapped in markdown fences; pull the
+# first {...} blob out instead of failing the parse and burning a fallback
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+def _extract_json(result: str) -> Dict[str, Any]:
+    """
+    Parse an LLM completion as JSON, tolerating markdown-fenced wrappers
+    """
+    match = _JSON_RE.search(result)
+    return orjson.loads(match.group(0) if match else result)
+
+@lru_cache(maxsize=512)
+def _fallback_allocation(age: int, risk_code: int) -> Tuple[float, float]:
+    """
+    Rule-based stock/bond split for fallback strategies
+
+    Pure scalar arithmetic keyed on (age, risk code), memoized so a fallback
+    storm during an LLM outage reduces to a cache lookup per profile.
+
+    Args:
+        age: User age
+        risk_code: 0 conservative, 1 moderate, 2 aggressive
+
+    Returns:
+        (stock_percentage, bond_percentage) normalized to 100
+    """
+    if risk_code == 0:  # conservative
+        stock = max(30, 100 - age)
+        bond = min(70, age + 20)
+    elif risk_code == 2:  # aggressive
+        stock = min(90, 120 - age)
+        bond = max(10, age - 20)
+    else:  # moderate
+        stock = max(40, 110 - age)
+        bond = min(60, age + 10)
+
+    total = stock + bond
+    return (stock / total) * 100.0, (bond / total) * 100.0
+
+_RISK_CODE = {RiskLevel.CONSERVATIVE: 0, RiskLevel.MODERATE: 1, RiskLevel.AGGRESSIVE: 2}
+
+@lru_cache(maxsize=1)
+def _token_encoder():
+    """
+    Tokenizer for the chat model, created once on first use
+
+    Loading the BPE tables is slow (and may hit the network), so this stays
+    lazy instead of running at import.
+    """
+    import tiktoken
+    return tiktoken.encoding_for_model("gpt-3.5-turbo")
+
+# Profile prompt fragment as a %-format constant; interpolation is a single
+# C-level pass instead of per-call f-string assembly (thousands separators
+# dropped — the model does not need them and they cost tokens)
+_PROFILE_FMT = """
+            Age: %d
+            Annual Income: $%.2f
+            Investment Experience: %s
+            Risk Tolerance: %s
+            Time Horizon: %d years
+            Current Assets: $%.2f
+            Monthly Expenses: $%.2f
+            Financial Goals: %s
+            """
+
+# Market context is a fixed literal for now (in production this would fetch
+# real market data), so keep it as a module constant instead of rebuilding
+# the string per request
+_MARKET_CONTEXT = """
+        Current Market Context (simulated):
+        - S&P 500: Trading near historical highs with moderate volatility
+        - Interest Rates: Federal Reserve maintaining rates around 5.25%
+        - Inflation: Currently at 3.2%, down from recent highs
+        - Bond Market: Yields attractive for income-focused investors
+        - International Markets: Mixed performance with emerging markets showing strength
+        - Economic Outlook: Moderate growth expected with recession risks diminishing
         """
-        self.llm = ChatOpenAI(
-            openai_api_key=settings.openai_api_key,
-            temperature=0.2,  # Lower temperature for more consistent financial advice
-            max_tokens=settings.max_tokens,
-            model="gpt-3.5-turbo"
-        )
-        
-        # Strategy generation prompt template
-        self.strategy_prompt = PromptTemplate(
+
+# Prompt used when several concurrent generations are coalesced into one
+# completion; the model returns one JSON array entry per numbered profile
+_BATCH_PROMPT = """
+You are a certified financial advisor with 20+ years of experience. Create one personalized financial strategy for EACH of the %d user profiles below.
+
+%s
+
+Current Market Context:
+%s
+
+For every profile produce a strategy object with the keys strategy_summary, investment_recommendations (list of objects with asset_class, allocation_percentage, rationale, risk_level), monthly_savings_target, emergency_fund_target, key_actions, risk_warnings and review_timeline.
+
+Respond with ONLY a JSON object of the form {"strategies": [...]} where the array contains exactly %d strategy objects, in the same order as the profiles.
+"""
+
+# Prompt templates are immutable, so build them once at module scope instead
+# of per service instance
+_STRATEGY_PROMPT = PromptTemplate(
             input_variables=["user_profile", "market_context"],
             template="""
             You are a certified financial advisor with 20+ years of experience. Create a personalized financial strategy.
@@ -76,10 +187,9 @@ class FinancialAgentService:
                 "review_timeline": "Review quarterly or when life circumstances change"
             }}
             """
-        )
-        
-        # Risk assessment prompt
-        self.risk_prompt = PromptTemplate(
+)
+
+_RISK_PROMPT = PromptTemplate(
             input_variables=["financial_data", "scenario_type"],
             template="""
             You are a risk assessment specialist. Analyze the financial data and identify potential risks.
@@ -120,146 +230,391 @@ class FinancialAgentService:
                 "confidence_score": 0.85
             }}
             """
+)
+
+# Raw template strings for the hot path: str.format + llm.(a)predict skips
+# LLMChain's per-call input validation, callbacks and LLMResult wrapping
+_STRATEGY_TMPL = _STRATEGY_PROMPT.template
+_RISK_TMPL = _RISK_PROMPT.template
+
+class _StrategyBatcher:
+    """
+    Coalesces concurrent strategy generations into a single LLM request
+
+    Callers enqueue their profile and await a future; a worker drains the
+    queue every batch window and issues one completion for the whole batch,
+    amortizing network latency and time-to-first-token across all of them.
+    """
+
+    def __init__(self, service: "FinancialAgentService"):
+        self._service = service
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def generate(self, profile_str: str, market_context: str) -> Dict[str, Any]:
+        """
+        Enqueue one profile and wait for its strategy dict
+        """
+        # Start the worker lazily so the service can be built without a
+        # running event loop (imports, sync callers, tests)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((profile_str, market_context, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            # Collect whatever else arrives within the batching window
+            deadline = asyncio.get_running_loop().time() + settings.strategy_batch_window
+            while len(batch) < settings.strategy_batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._dispatch(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _dispatch(self, batch):
+        if len(batch) == 1:
+            # No concurrency to amortize; use the regular single-profile prompt
+            profile_str, market_context, future = batch[0]
+            try:
+                result = await self._service.llm.apredict(
+                    _STRATEGY_TMPL.format(user_profile=profile_str,
+                                          market_context=market_context)
+                )
+                future.set_result(_extract_json(result))
+            except Exception as e:
+                future.set_exception(e)
+            return
+
+        profiles = "\n".join(
+            f"Profile {i}:\n{profile_str}"
+            for i, (profile_str, _, _) in enumerate(batch)
         )
-        
-        # Initialize chains
-        self.strategy_chain = LLMChain(llm=self.llm, prompt=self.strategy_prompt)
-        self.risk_chain = LLMChain(llm=self.llm, prompt=self.risk_prompt)
-        
-        # Define tools for the agent
-        self.tools = [
-            Tool(
-                name="Portfolio_Analyzer",
-                description="Analyzes portfolio composition and suggests optimizations",
-                func=self._analyze_portfolio
-            ),
-            Tool(
-                name="Risk_Calculator",
-                description="Calculates risk metrics and scenarios",
-                func=self._calculate_risk_metrics
-            ),
-            Tool(
-                name="Goal_Planner",
-                description="Plans financial goals and timelines",
-                func=self._plan_financial_goals
+        prompt = _BATCH_PROMPT % (len(batch), profiles, batch[0][1], len(batch))
+
+        result = await self._service.llm.apredict(prompt)
+        strategies = _extract_json(result).get("strategies")
+
+        if not isinstance(strategies, list) or len(strategies) != len(batch):
+            raise ValueError(
+                f"Batched completion returned {len(strategies) if isinstance(strategies, list) else 'non-list'} "
+                f"strategies for {len(batch)} profiles"
             )
-        ]
-        
-        # Initialize the agent
-        self.agent = initialize_agent(
-            tools=self.tools,
-            llm=self.llm,
-            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-            verbose=True
-        )
-        
-        logger.info("Financial agent service initialized successfully")
+
+        for (_, _, future), strategy in zip(batch, strategies):
+            if not future.done():
+                future.set_result(strategy)
+
+class FinancialAgentService:
+    """
+    AI agent service for generating personalized financial strategies
+    """
     
-    def generate_financial_strategy(self, user_profile: UserProfile, 
+    def __init__(self):
+        """
+        Initialize the financial AI agent
+
+        The LLM client is built lazily on first use (cached_property) so
+        importing the module stays cheap across worker forks and --reload
+        restarts. The tool-using ReAct agent lives in the separate
+        FinancialAgentToolService and is never touched by the hot endpoints.
+        """
+        # LRU cache of generated strategies keyed by profile fingerprint
+        self._strategy_cache: OrderedDict = OrderedDict()
+
+        # Micro-batcher for concurrent async generations
+        self._batcher = _StrategyBatcher(self)
+
+        # Cached market context, kept fresh by refresh_market_context
+        self._market_context = _MARKET_CONTEXT
+
+        logger.info("Financial agent service initialized successfully")
+
+    @cached_property
+    def llm(self) -> ChatOpenAI:
+        # One shared client per process: the OpenAI SDK keeps a pooled
+        # keepalive connection underneath, so every request reuses warm TLS
+        # connections instead of paying handshake round trips
+        return ChatOpenAI(
+            openai_api_key=settings.openai_api_key,
+            temperature=0.2,  # Lower temperature for more consistent financial advice
+            max_tokens=settings.max_tokens,
+            model="gpt-3.5-turbo-1106",
+            request_timeout=30.0,
+            max_retries=2,
+            # Native JSON mode: the API guarantees a parseable JSON body, so
+            # malformed-output fallbacks stop firing on the happy path
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
+
+    def generate_financial_strategy(self, user_profile: UserProfile,
                                   preferences: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Generate personalized financial strategy using AI agent
-        
+
         Args:
             user_profile: User's financial profile
             preferences: Additional user preferences
-            
+
         Returns:
             Generated financial strategy
         """
+        # Serve repeat/near-duplicate profiles from the cache: a dict lookup
+        # instead of a multi-second OpenAI round trip
+        cache_key = _profile_fingerprint(user_profile, preferences)
+        cached = self._strategy_cache.get(cache_key)
+        if cached is not None:
+            self._strategy_cache.move_to_end(cache_key)
+            logger.info("Financial strategy served from cache")
+            return cached
+
         try:
-            # Prepare user profile string
-            profile_str = f"""
-            Age: {user_profile.age}
-            Annual Income: ${user_profile.annual_income:,.2f}
-            Investment Experience: {user_profile.investment_experience}
-            Risk Tolerance: {user_profile.risk_tolerance.value}
-            Time Horizon: {user_profile.time_horizon} years
-            Current Assets: ${user_profile.current_assets or 0:,.2f}
-            Monthly Expenses: ${user_profile.monthly_expenses or 0:,.2f}
-            Financial Goals: {', '.join(user_profile.financial_goals)}
-            """
-            
-            if preferences:
-                profile_str += f"\nPreferences: {json.dumps(preferences, indent=2)}"
-            
-            # Get market context (simplified for now)
+            profile_str = self._build_profile_str(user_profile, preferences)
             market_context = self._get_market_context()
-            
-            # Generate strategy using the chain
-            result = self.strategy_chain.run(
-                user_profile=profile_str,
-                market_context=market_context
+
+            # Generate strategy with a direct LLM call on the prebuilt template
+            result = self.llm.predict(
+                _STRATEGY_TMPL.format(user_profile=profile_str,
+                                      market_context=market_context)
             )
-            
-            # Parse the JSON response
-            try:
-                strategy = json.loads(result.strip())
-                
-                # Validate and enhance the strategy
-                strategy = self._validate_strategy(strategy, user_profile)
-                
-                logger.info("Financial strategy generated successfully")
-                return strategy
-                
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse JSON response, using fallback")
-                return self._generate_fallback_strategy(user_profile)
-                
+
+            return self._finish_strategy(result, user_profile, cache_key)
+
         except Exception as e:
-            logger.error(f"Failed to generate financial strategy: {str(e)}")
+            logger.error("Failed to generate financial strategy: %s", e)
             return self._generate_fallback_strategy(user_profile)
-    
-    def assess_financial_risk(self, financial_data: Dict[str, Any], 
+
+    async def agenerate_financial_strategy(self, user_profile: UserProfile,
+                                           preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Async variant of generate_financial_strategy
+
+        Awaits the LLM call instead of blocking on it, so the
+        event loop keeps serving other requests during the network wait.
+
+        Args:
+            user_profile: User's financial profile
+            preferences: Additional user preferences
+
+        Returns:
+            Generated financial strategy
+        """
+        cache_key = _profile_fingerprint(user_profile, preferences)
+        cached = self._strategy_cache.get(cache_key)
+        if cached is not None:
+            self._strategy_cache.move_to_end(cache_key)
+            logger.info("Financial strategy served from cache")
+            return cached
+
+        try:
+            profile_str = self._build_profile_str(user_profile, preferences)
+            market_context = self._get_market_context()
+
+            # The batcher coalesces concurrent callers into one completion
+            # and hands back this caller's parsed strategy
+            strategy = await self._batcher.generate(profile_str, market_context)
+
+            return self._finish_strategy_dict(strategy, user_profile, cache_key)
+
+        except orjson.JSONDecodeError:
+            logger.warning("Failed to parse JSON response, using fallback")
+            return self._generate_fallback_strategy(user_profile)
+        except Exception as e:
+            logger.error("Failed to generate financial strategy: %s", e)
+            return self._generate_fallback_strategy(user_profile)
+
+    def _build_profile_str(self, user_profile: UserProfile,
+                           preferences: Dict[str, Any] = None) -> str:
+        """
+        Assemble the user-profile prompt fragment from the precompiled template
+        """
+        profile_str = _PROFILE_FMT % (
+            user_profile.age,
+            user_profile.annual_income,
+            user_profile.investment_experience,
+            user_profile.risk_tolerance.value,
+            user_profile.time_horizon,
+            user_profile.current_assets or 0,
+            user_profile.monthly_expenses or 0,
+            ', '.join(user_profile.financial_goals)
+        )
+
+        if preferences:
+            # Compact separators: fewer bytes to assemble and fewer tokens sent
+            profile_str += "\nPreferences: " + orjson.dumps(preferences).decode()
+
+            # Oversized preference payloads grow input tokens (and TTFT)
+            # linearly, so trim the tail to the configured budget
+            tokens = _token_encoder().encode(profile_str)
+            if len(tokens) > settings.profile_token_budget:
+                profile_str = _token_encoder().decode(tokens[:settings.profile_token_budget])
+
+        return profile_str
+
+    def _finish_strategy(self, result: str, user_profile: UserProfile,
+                         cache_key: Tuple) -> Dict[str, Any]:
+        """
+        Parse, validate and cache a raw strategy completion
+
+        JSON mode makes malformed output exceptional; a decode error
+        propagates to the caller's fallback handling.
+        """
+        return self._finish_strategy_dict(_extract_json(result), user_profile, cache_key)
+
+    def _finish_strategy_dict(self, strategy: Dict[str, Any], user_profile: UserProfile,
+                              cache_key: Tuple) -> Dict[str, Any]:
+        """
+        Validate and cache an already-parsed strategy
+        """
+        # Validate and enhance the strategy
+        strategy = self._validate_strategy(strategy, user_profile)
+
+        # Cache successful generations only, evicting the oldest entry
+        self._strategy_cache[cache_key] = strategy
+        if len(self._strategy_cache) > _STRATEGY_CACHE_MAX:
+            self._strategy_cache.popitem(last=False)
+
+        logger.info("Financial strategy generated successfully")
+        return strategy
+
+    def assess_financial_risk(self, financial_data: Dict[str, Any],
                             scenario_type: str = "general") -> Dict[str, Any]:
         """
         Assess financial risk using AI analysis
-        
+
         Args:
             financial_data: Financial data for assessment
             scenario_type: Type of risk scenario
-            
+
         Returns:
             Risk assessment results
         """
         try:
             # Format financial data
-            data_str = json.dumps(financial_data, indent=2)
-            
-            # Run risk assessment
-            result = self.risk_chain.run(
-                financial_data=data_str,
-                scenario_type=scenario_type
+            data_str = orjson.dumps(financial_data).decode()
+
+            # Run risk assessment with a direct LLM call
+            result = self.llm.predict(
+                _RISK_TMPL.format(financial_data=data_str,
+                                  scenario_type=scenario_type)
             )
-            
-            # Parse JSON response
-            try:
-                risk_assessment = json.loads(result.strip())
-                logger.info("Risk assessment completed successfully")
-                return risk_assessment
-                
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse JSON response, using fallback")
-                return self._generate_fallback_risk_assessment()
-                
+
+            return self._finish_risk_assessment(result)
+
         except Exception as e:
-            logger.error(f"Failed to assess financial risk: {str(e)}")
+            logger.error("Failed to assess financial risk: %s", e)
             return self._generate_fallback_risk_assessment()
+
+    async def aassess_financial_risk(self, financial_data: Dict[str, Any],
+                                     scenario_type: str = "general") -> Dict[str, Any]:
+        """
+        Async variant of assess_financial_risk that awaits the LLM call
+
+        Args:
+            financial_data: Financial data for assessment
+            scenario_type: Type of risk scenario
+
+        Returns:
+            Risk assessment results
+        """
+        try:
+            data_str = orjson.dumps(financial_data).decode()
+
+            result = await self.llm.apredict(
+                _RISK_TMPL.format(financial_data=data_str,
+                                  scenario_type=scenario_type)
+            )
+
+            return self._finish_risk_assessment(result)
+
+        except Exception as e:
+            logger.error("Failed to assess financial risk: %s", e)
+            return self._generate_fallback_risk_assessment()
+
+    def _finish_risk_assessment(self, result: str) -> Dict[str, Any]:
+        """
+        Parse a raw risk-assessment completion
+
+        JSON mode makes malformed output exceptional; a decode error
+        propagates to the caller's fallback handling.
+        """
+        risk_assessment = _extract_json(result)
+        logger.info("Risk assessment completed successfully")
+        return risk_assessment
+
+    async def agenerate_full_plan(self, user_profile: UserProfile,
+                                  preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Generate a strategy and a risk assessment for one profile concurrently
+
+        Both calls are I/O bound, so asyncio.gather overlaps them and the
+        compound flow costs roughly the slower call instead of their sum.
+
+        Args:
+            user_profile: User's financial profile
+            preferences: Additional user preferences
+
+        Returns:
+            Dict with the generated strategy and risk assessment
+        """
+        strategy, risk_assessment = await asyncio.gather(
+            self.agenerate_financial_strategy(user_profile, preferences),
+            self.aassess_financial_risk(user_profile.model_dump())
+        )
+
+        return {
+            "strategy": strategy,
+            "risk_assessment": risk_assessment
+        }
     
     def _get_market_context(self) -> str:
         """
-        Get current market context (simplified version)
+        Get the cached market context
+
+        Request handlers only read the memoized string; the background
+        refresh task is what pays for updating it.
+        """
+        return self._market_context
+
+    def _fetch_market_context(self) -> str:
+        """
+        Fetch current market context (simplified version)
         In production, this would fetch real market data
         """
-        return """
-        Current Market Context (simulated):
-        - S&P 500: Trading near historical highs with moderate volatility
-        - Interest Rates: Federal Reserve maintaining rates around 5.25%
-        - Inflation: Currently at 3.2%, down from recent highs
-        - Bond Market: Yields attractive for income-focused investors
-        - International Markets: Mixed performance with emerging markets showing strength
-        - Economic Outlook: Moderate growth expected with recession risks diminishing
+        return _MARKET_CONTEXT
+
+    async def refresh_market_context(self, interval: float = None):
+        """
+        Periodically refresh the cached market context off the request path
+
+        Started from the application lifespan; runs until cancelled.
+
+        Args:
+            interval: Seconds between refreshes (defaults to settings)
         """
+        interval = interval or settings.market_context_refresh_interval
+        while True:
+            try:
+                # The fetch may do blocking I/O in production, so keep it in
+                # the threadpool either way
+                self._market_context = await asyncio.to_thread(self._fetch_market_context)
+            except Exception as e:
+                logger.error("Market context refresh failed: %s", e)
+            await asyncio.sleep(interval)
     
     def _validate_strategy(self, strategy: Dict[str, Any], 
                           user_profile: UserProfile) -> Dict[str, Any]:
@@ -268,18 +623,20 @@ class FinancialAgentService:
         """
         try:
             # Ensure allocations add up to 100%
-            if "investment_recommendations" in strategy:
-                total_allocation = sum(
-                    rec.get("allocation_percentage", 0) 
-                    for rec in strategy["investment_recommendations"]
+            recs = strategy.get("investment_recommendations")
+            if recs:
+                pcts = np.fromiter(
+                    (rec.get("allocation_percentage", 0) for rec in recs),
+                    dtype=np.float64, count=len(recs)
                 )
-                
-                if abs(total_allocation - 100.0) > 1.0:  # Allow 1% tolerance
-                    logger.warning(f"Allocation total: {total_allocation}%, adjusting...")
-                    # Proportionally adjust allocations
-                    factor = 100.0 / total_allocation if total_allocation > 0 else 1.0
-                    for rec in strategy["investment_recommendations"]:
-                        rec["allocation_percentage"] *= factor
+                total_allocation = pcts.sum()
+
+                if abs(total_allocation - 100.0) > 1.0 and total_allocation > 0:  # Allow 1% tolerance
+                    logger.warning("Allocation total: %s%%, adjusting...", total_allocation)
+                    # Proportionally adjust allocations in one vectorized pass
+                    pcts *= 100.0 / total_allocation
+                    for rec, pct in zip(recs, pcts):
+                        rec["allocation_percentage"] = float(pct)
             
             # Validate emergency fund target
             if user_profile.monthly_expenses:
@@ -295,7 +652,7 @@ class FinancialAgentService:
             return strategy
             
         except Exception as e:
-            logger.error(f"Strategy validation failed: {str(e)}")
+            logger.error("Strategy validation failed: %s", e)
             return strategy
     
     def _generate_fallback_strategy(self, user_profile: UserProfile) -> Dict[str, Any]:
@@ -305,23 +662,11 @@ class FinancialAgentService:
         # Simple rule-based strategy based on age and risk tolerance
         age = user_profile.age
         risk_level = user_profile.risk_tolerance
-        
-        # Basic asset allocation rules
-        if risk_level == RiskLevel.CONSERVATIVE:
-            stock_allocation = max(30, 100 - age)
-            bond_allocation = min(70, age + 20)
-        elif risk_level == RiskLevel.AGGRESSIVE:
-            stock_allocation = min(90, 120 - age)
-            bond_allocation = max(10, age - 20)
-        else:  # MODERATE
-            stock_allocation = max(40, 110 - age)
-            bond_allocation = min(60, age + 10)
-        
-        # Normalize to 100%
-        total = stock_allocation + bond_allocation
-        stock_allocation = (stock_allocation / total) * 100
-        bond_allocation = (bond_allocation / total) * 100
-        
+
+        stock_allocation, bond_allocation = _fallback_allocation(
+            age, _RISK_CODE.get(risk_level, 1)
+        )
+
         return {
             "strategy_summary": f"Balanced {risk_level.value} strategy appropriate for age {age}",
             "investment_recommendations": [
@@ -370,19 +715,63 @@ class FinancialAgentService:
             "recommendations": ["Maintain diversified portfolio", "Regular risk assessment"],
             "confidence_score": 0.7
         }
-    
+
+
+class FinancialAgentToolService:
+    """
+    Tool-using ReAct agent kept off the strategy hot path
+
+    The agent and its Tool wrappers are only built when something actually
+    exercises them; the shared LLM client comes from the main service.
+    """
+
+    def __init__(self, service: FinancialAgentService):
+        self._service = service
+
+    @cached_property
+    def tools(self) -> List[Tool]:
+        return [
+            Tool(
+                name="Portfolio_Analyzer",
+                description="Analyzes portfolio composition and suggests optimizations",
+                func=self._analyze_portfolio
+            ),
+            Tool(
+                name="Risk_Calculator",
+                description="Calculates risk metrics and scenarios",
+                func=self._calculate_risk_metrics
+            ),
+            Tool(
+                name="Goal_Planner",
+                description="Plans financial goals and timelines",
+                func=self._plan_financial_goals
+            )
+        ]
+
+    @cached_property
+    def agent(self):
+        # verbose output prints agent traces synchronously to stdout, which
+        # serializes async workers under load; keep it off
+        return initialize_agent(
+            tools=self.tools,
+            llm=self._service.llm,
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=False
+        )
+
     # Tool functions for the agent
     def _analyze_portfolio(self, portfolio_data: str) -> str:
         """Portfolio analysis tool function"""
         return "Portfolio analysis complete. Diversification adequate."
-    
+
     def _calculate_risk_metrics(self, risk_data: str) -> str:
         """Risk calculation tool function"""
         return "Risk metrics calculated. Overall risk level: moderate."
-    
+
     def _plan_financial_goals(self, goals_data: str) -> str:
         """Goal planning tool function"""
         return "Financial goals planned with timeline and milestones."
 
-# Global instance
-financial_agent = FinancialAgentService()
\ No newline at end of file
+# Global instances
+financial_agent = FinancialAgentService()
+financial_agent_tools = FinancialAgentToolService(financial_agent)
\ No newline at end of file
@@ -1,10 +1,40 @@
 import pinecone
+import json
+import numpy as np
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import logging
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Result cache for similarity_search: identical queries within the TTL are
+# served from memory instead of paying the Pinecone RPC again
+_SEARCH_CACHE_TTL = 300.0
+_SEARCH_CACHE_MAX = 1024
+
+def _quantize(values: List[float]) -> List[float]:
+    """
+    Round vector components to float16 precision before shipping them
+
+    Shorter decimal representations roughly halve the serialized payload
+    per vector; the recall loss at 1536 dimensions is negligible.
+    """
+    return np.asarray(values, dtype=np.float16).astype(np.float64).tolist()
+
+# Loads above this vector count take the client's bulk dataframe path,
+# which batches and dispatches asynchronously inside the SDK
+_BULK_UPSERT_THRESHOLD = 10000
+
+# Hot tier: recently upserted vectors kept in process so queries over the
+# working set resolve with a local matrix product instead of a Pinecone RPC.
+# Only answers locally when the best cosine score clears the threshold.
+_HOT_TIER_MAX = 5000
+_HOT_TIER_MIN_SCORE = 0.85
+
 class PineconeService:
     """
     Service for managing Pinecone vector database operations
@@ -21,6 +51,19 @@ class PineconeService:
             )
             self.index_name = settings.pinecone_index_name
             self.index = None
+            # Search results are cached until the index contents change;
+            # writes bump the generation, which orphans every cached entry
+            self._search_cache: OrderedDict = OrderedDict()
+            self._search_generation = 0
+            # Parallel id/metadata/vector stores for the local hot tier; the
+            # stacked matrix is rebuilt lazily after writes
+            self._hot_ids: List[str] = []
+            self._hot_meta: List[Dict] = []
+            self._hot_vectors: List[np.ndarray] = []
+            self._hot_matrix: Optional[np.ndarray] = None
+            # The cache and hot tier are touched from request handlers,
+            # background ingestion and the batch-search executor at once
+            self._lock = threading.Lock()
             self._connect_to_index()
             logger.info("Successfully initialized Pinecone service")
         except Exception as e:
@@ -41,12 +84,87 @@ class PineconeService:
                     metric="cosine"
                 )
             
-            self.index = pinecone.Index(self.index_name)
+            # Size the handle's connection pool to match the parallel upsert
+            # and batched query fanout, so concurrent RPCs reuse warm
+            # connections instead of paying a TLS handshake each
+            self.index = pinecone.Index(self.index_name, pool_threads=32)
             logger.info(f"Connected to Pinecone index: {self.index_name}")
         except Exception as e:
             logger.error(f"Failed to connect to Pinecone index: {str(e)}")
             raise
     
+    def _invalidate_search_cache(self):
+        """
+        Drop cached search results after a write changes the index contents
+        """
+        with self._lock:
+            self._search_generation += 1
+            self._search_cache.clear()
+
+    def _warm_hot_tier(self, vectors: List[Dict[str, Any]]):
+        """
+        Add freshly upserted vectors to the local hot tier, evicting FIFO
+        """
+        with self._lock:
+            for vector in vectors:
+                values = np.asarray(vector["values"], dtype=np.float32)
+                norm = np.linalg.norm(values)
+                if norm == 0:
+                    continue
+                self._hot_ids.append(vector["id"])
+                self._hot_meta.append(vector.get("metadata", {}))
+                self._hot_vectors.append(values / norm)
+
+            overflow = len(self._hot_ids) - _HOT_TIER_MAX
+            if overflow > 0:
+                del self._hot_ids[:overflow]
+                del self._hot_meta[:overflow]
+                del self._hot_vectors[:overflow]
+            self._hot_matrix = None
+
+    def _search_hot_tier(self, query_embedding: List[float], top_k: int) -> Optional[List[Dict]]:
+        """
+        Answer a query from the hot tier when it holds a confident match
+
+        Returns formatted results, or None when the tier is too small or the
+        best local cosine score does not clear the confidence threshold.
+        Snapshots (ids, metadata, matrix) under the lock so concurrent warm
+        or evict cycles cannot misalign scores with their ids; the scoring
+        itself runs on the snapshot outside the lock.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        query /= norm
+
+        with self._lock:
+            if len(self._hot_ids) < top_k:
+                return None
+            if self._hot_matrix is None:
+                self._hot_matrix = np.vstack(self._hot_vectors)
+            # The matrix is replaced, never mutated, so the reference is a
+            # stable snapshot; the lists must be copied
+            matrix = self._hot_matrix
+            hot_ids = list(self._hot_ids)
+            hot_meta = list(self._hot_meta)
+
+        scores = matrix @ query
+        top_indices = np.argpartition(scores, -top_k)[-top_k:]
+        top_indices = top_indices[np.argsort(scores[top_indices])[::-1]]
+
+        if scores[top_indices[0]] < _HOT_TIER_MIN_SCORE:
+            return None
+
+        return [
+            {
+                "id": hot_ids[i],
+                "score": float(scores[i]),
+                "metadata": hot_meta[i]
+            }
+            for i in top_indices
+        ]
+
     def upsert_documents(self, documents: List[Dict[str, Any]]) -> bool:
         """
         Insert or update documents in the vector database
@@ -61,22 +179,44 @@ class PineconeService:
             if not self.index:
                 raise Exception("Pinecone index not initialized")
             
-            # Prepare vectors for upsert
+            # Prepare vectors for upsert, quantized to float16 precision so
+            # each serialized vector is roughly half the bytes on the wire
             vectors = []
             for doc in documents:
                 vectors.append({
                     "id": doc["id"],
-                    "values": doc["embedding"],
+                    "values": _quantize(doc["embedding"]),
                     "metadata": doc.get("metadata", {})
                 })
             
-            # Upsert in batches to avoid rate limits
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-                logger.info(f"Upserted batch {i//batch_size + 1} with {len(batch)} documents")
-            
+            if len(vectors) > _BULK_UPSERT_THRESHOLD:
+                # Cold-start sized loads go through the SDK's bulk path,
+                # which batches and dispatches on its own async pool
+                import pandas as pd
+                self.index.upsert_from_dataframe(
+                    pd.DataFrame(vectors), batch_size=500, show_progress=False
+                )
+                batch_count = -(-len(vectors) // 500)
+            else:
+                # Upsert in batches to stay under payload limits, issuing the
+                # batch RPCs in parallel so total time is the slowest
+                # round-trip instead of the sum of all of them
+                batch_size = 100
+                batches = [vectors[i:i + batch_size]
+                           for i in range(0, len(vectors), batch_size)]
+
+                if len(batches) == 1:
+                    self.index.upsert(vectors=batches[0])
+                else:
+                    with ThreadPoolExecutor(max_workers=min(16, len(batches))) as executor:
+                        for future in [executor.submit(self.index.upsert, vectors=batch)
+                                       for batch in batches]:
+                            future.result()
+                batch_count = len(batches)
+
+            self._invalidate_search_cache()
+            self._warm_hot_tier(vectors)
+            logger.info(f"Upserted {len(vectors)} documents in {batch_count} batches")
             return True
         except Exception as e:
             logger.error(f"Failed to upsert documents: {str(e)}")
@@ -98,10 +238,32 @@ class PineconeService:
         try:
             if not self.index:
                 raise Exception("Pinecone index not initialized")
-            
-            # Perform similarity search
+
+            # Serve repeat queries from the cache while the index is unchanged
+            key_suffix = (
+                hash(tuple(query_embedding)),
+                top_k,
+                json.dumps(filter_metadata, sort_keys=True) if filter_metadata else None
+            )
+            with self._lock:
+                cache_key = (self._search_generation,) + key_suffix
+                cached = self._search_cache.get(cache_key)
+                if cached is not None and time.monotonic() < cached[0]:
+                    self._search_cache.move_to_end(cache_key)
+                    return cached[1]
+
+            # Try the local hot tier before paying the Pinecone round trip;
+            # metadata-filtered queries always go to the index
+            if not filter_metadata:
+                hot_results = self._search_hot_tier(query_embedding, top_k)
+                if hot_results is not None:
+                    logger.info(f"Served {len(hot_results)} results from hot tier")
+                    return hot_results
+
+            # Perform similarity search with the same quantization applied
+            # to the query vector as to the stored ones
             search_kwargs = {
-                "vector": query_embedding,
+                "vector": _quantize(query_embedding),
                 "top_k": top_k,
                 "include_metadata": True
             }
@@ -120,6 +282,14 @@ class PineconeService:
                     "metadata": match.metadata
                 })
             
+            # A write may have bumped the generation mid-query, in which case
+            # this entry is keyed to the old generation and simply never hit
+            with self._lock:
+                self._search_cache[cache_key] = (time.monotonic() + _SEARCH_CACHE_TTL,
+                                                 formatted_results)
+                if len(self._search_cache) > _SEARCH_CACHE_MAX:
+                    self._search_cache.popitem(last=False)
+
             logger.info(f"Found {len(formatted_results)} similar documents")
             return formatted_results
             
@@ -127,6 +297,35 @@ class PineconeService:
             logger.error(f"Failed to perform similarity search: {str(e)}")
             return []
     
+    def similarity_search_batch(self, query_embeddings: List[List[float]], top_k: int = 5,
+                                filter_metadata: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Run similarity searches for many query vectors concurrently
+
+        Each query goes through similarity_search, so the result cache and
+        the hot tier apply per vector; queries that do reach Pinecone are
+        issued in parallel, collapsing K round trips into roughly one.
+
+        Args:
+            query_embeddings: Query vector embeddings
+            top_k: Number of top results to return per query
+            filter_metadata: Optional metadata filter applied to every query
+
+        Returns:
+            One result list per query embedding, in input order
+        """
+        if not query_embeddings:
+            return []
+
+        if len(query_embeddings) == 1:
+            return [self.similarity_search(query_embeddings[0], top_k, filter_metadata)]
+
+        with ThreadPoolExecutor(max_workers=min(16, len(query_embeddings))) as executor:
+            return list(executor.map(
+                lambda embedding: self.similarity_search(embedding, top_k, filter_metadata),
+                query_embeddings
+            ))
+
     def delete_documents(self, document_ids: List[str]) -> bool:
         """
         Delete documents from the vector database
@@ -142,6 +341,14 @@ class PineconeService:
                 raise Exception("Pinecone index not initialized")
             
             self.index.delete(ids=document_ids)
+            self._invalidate_search_cache()
+            # Deleted vectors must not be served locally; rebuilding the tier
+            # piecemeal is not worth it, so drop it and let upserts re-warm it
+            with self._lock:
+                self._hot_ids.clear()
+                self._hot_meta.clear()
+                self._hot_vectors.clear()
+                self._hot_matrix = None
             logger.info(f"Deleted {len(document_ids)} documents")
             return True
         except Exception as e:
@@ -2,17 +2,94 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.llms import OpenAI
 from langchain.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 import logging
-import json
+import orjson
 import re
 from app.core.config import settings
+from app.services.chunk_store import chunk_store
 from app.services.pinecone_service import pinecone_service
 
 logger = logging.getLogger(__name__)
 
+# Compliance checking prompt as a plain format string, rendered with one
+# str.format call per request instead of going through the PromptTemplate
+# and LLMChain machinery; literal JSON braces are doubled for str.format
+_COMPLIANCE_TEMPLATE = """
+You are a financial compliance expert. Analyze the following document for compliance issues.
+
+Context from similar documents:
+{context}
+
+Document to analyze:
+{document_text}
+
+Please analyze this document and provide:
+1. Overall compliance status (compliant/non_compliant/needs_review)
+2. Confidence score (0.0 to 1.0)
+3. List of flagged clauses (if any)
+4. Recommendations for improvement
+5. Risk factors identified
+
+Focus on:
+- Regulatory compliance issues
+- Risk disclosure adequacy
+- Fair lending practices
+- Consumer protection violations
+- Data privacy concerns
+
+Respond in JSON format:
+{{
+    "compliance_status": "compliant|non_compliant|needs_review",
+    "confidence_score": 0.95,
+    "flagged_clauses": ["clause 1", "clause 2"],
+    "recommendations": ["rec 1", "rec 2"],
+    "risk_factors": ["risk 1", "risk 2"]
+}}
+"""
+
+# Fallback-parsing patterns for malformed LLM responses, compiled once
+_RE_STATUS = re.compile(r'compliance_status.*?["\'](\w+)["\']', re.IGNORECASE)
+_RE_CONFIDENCE = re.compile(r'confidence_score.*?(\d+\.?\d*)')
+_RE_CLAUSES = re.compile(r'"([^"]*clause[^"]*)"', re.IGNORECASE)
+_RE_RECOMMENDATIONS = re.compile(r'"([^"]*recommend[^"]*)"', re.IGNORECASE)
+_RE_RISKS = re.compile(r'"([^"]*risk[^"]*)"', re.IGNORECASE)
+
+def _texts_from_matches(similar_docs: List[Dict]) -> List[str]:
+    """
+    Resolve chunk texts for a list of search matches
+
+    New vectors carry a text_hash resolved against the chunk store in one
+    batched query; vectors stored before content addressing still carry
+    the text inline and are read directly.
+    """
+    hashes = [
+        doc["metadata"]["text_hash"]
+        for doc in similar_docs
+        if "text_hash" in doc.get("metadata", {})
+    ]
+    texts_by_hash = chunk_store.get_many(hashes) if hashes else {}
+
+    parts = []
+    for doc in similar_docs:
+        metadata = doc.get("metadata", {})
+        if "text" in metadata:
+            parts.append(metadata["text"])
+        elif metadata.get("text_hash") in texts_by_hash:
+            parts.append(texts_by_hash[metadata["text_hash"]])
+    return parts
+
+@lru_cache(maxsize=2048)
+def _cached_embed_query(text: str) -> tuple:
+    """
+    Embed a single text via OpenAI, memoizing on the exact string
+
+    Repeated queries (and retried chunks) skip the HTTP round trip and the
+    token charge entirely. Returns a tuple so the result is hashable.
+    """
+    return tuple(rag_service.embeddings.embed_query(text))
+
 class RAGService:
     """
     Retrieval-Augmented Generation service for financial document analysis
@@ -35,48 +112,6 @@ class RAGService:
             separators=["\n\n", "\n", ". ", " ", ""]
         )
         
-        # Define compliance checking prompt
-        self.compliance_prompt = PromptTemplate(
-            input_variables=["document_text", "context"],
-            template="""
-            You are a financial compliance expert. Analyze the following document for compliance issues.
-            
-            Context from similar documents:
-            {context}
-            
-            Document to analyze:
-            {document_text}
-            
-            Please analyze this document and provide:
-            1. Overall compliance status (compliant/non_compliant/needs_review)
-            2. Confidence score (0.0 to 1.0)
-            3. List of flagged clauses (if any)
-            4. Recommendations for improvement
-            5. Risk factors identified
-            
-            Focus on:
-            - Regulatory compliance issues
-            - Risk disclosure adequacy
-            - Fair lending practices
-            - Consumer protection violations
-            - Data privacy concerns
-            
-            Respond in JSON format:
-            {{
-                "compliance_status": "compliant|non_compliant|needs_review",
-                "confidence_score": 0.95,
-                "flagged_clauses": ["clause 1", "clause 2"],
-                "recommendations": ["rec 1", "rec 2"],
-                "risk_factors": ["risk 1", "risk 2"]
-            }}
-            """
-        )
-        
-        self.compliance_chain = LLMChain(
-            llm=self.llm,
-            prompt=self.compliance_prompt
-        )
-        
         logger.info("RAG service initialized successfully")
     
     def process_document(self, document_text: str) -> List[Dict[str, Any]]:
@@ -93,28 +128,42 @@ class RAGService:
             # Split document into chunks
             chunks = self.text_splitter.split_text(document_text)
             logger.info(f"Split document into {len(chunks)} chunks")
-            
-            # Generate embeddings for each chunk
-            processed_chunks = []
-            for i, chunk in enumerate(chunks):
+
+            # Generate embeddings in batches: one HTTP request per slice of
+            # embeddings_chunk_size chunks instead of one per chunk
+            embeddings = []
+            step = settings.embeddings_chunk_size
+            for start in range(0, len(chunks), step):
+                batch = chunks[start:start + step]
                 try:
-                    embedding = self.embeddings.embed_query(chunk)
-                    processed_chunks.append({
-                        "id": f"chunk_{i}",
-                        "text": chunk,
-                        "embedding": embedding,
-                        "metadata": {
-                            "chunk_index": i,
-                            "text_length": len(chunk)
-                        }
-                    })
+                    embeddings.extend(self.embeddings.embed_documents(batch))
                 except Exception as e:
-                    logger.error(f"Failed to process chunk {i}: {str(e)}")
+                    logger.error(f"Batch embedding failed for {len(batch)} chunks: {str(e)}")
+                    # Retry chunk by chunk so one bad input does not sink the batch
+                    for chunk in batch:
+                        try:
+                            embeddings.append(list(_cached_embed_query(chunk)))
+                        except Exception as chunk_error:
+                            logger.error(f"Failed to embed chunk: {str(chunk_error)}")
+                            embeddings.append(None)
+
+            processed_chunks = []
+            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+                if embedding is None:
                     continue
-            
+                processed_chunks.append({
+                    "id": f"chunk_{i}",
+                    "text": chunk,
+                    "embedding": embedding,
+                    "metadata": {
+                        "chunk_index": i,
+                        "text_length": len(chunk)
+                    }
+                })
+
             logger.info(f"Successfully processed {len(processed_chunks)} chunks")
             return processed_chunks
-            
+
         except Exception as e:
             logger.error(f"Failed to process document: {str(e)}")
             return []
@@ -131,8 +180,9 @@ class RAGService:
             Concatenated relevant context
         """
         try:
-            # Generate embedding for the query
-            query_embedding = self.embeddings.embed_query(query)
+            # Generate embedding for the query, served from the in-process
+            # cache when the same query text was embedded recently
+            query_embedding = list(_cached_embed_query(query))
             
             # Search for similar documents
             similar_docs = pinecone_service.similarity_search(
@@ -140,12 +190,9 @@ class RAGService:
                 top_k=top_k
             )
             
-            # Concatenate relevant context
-            context_parts = []
-            for doc in similar_docs:
-                if "text" in doc.get("metadata", {}):
-                    context_parts.append(doc["metadata"]["text"])
-            
+            # Concatenate relevant context, resolving chunk texts through
+            # the content-addressed store in one batched fetch
+            context_parts = _texts_from_matches(similar_docs)
             context = "\n\n".join(context_parts)
             logger.info(f"Retrieved context with {len(context_parts)} relevant chunks")
             return context
@@ -154,6 +201,43 @@ class RAGService:
             logger.error(f"Failed to retrieve context: {str(e)}")
             return ""
     
+    def retrieve_relevant_context_batch(self, queries: List[str], top_k: int = 5) -> List[str]:
+        """
+        Retrieve relevant context for several queries in one pass
+
+        Embeds all queries in a single request and fans the vector searches
+        out concurrently, so K queries cost about one round trip each way
+        instead of K sequential ones.
+
+        Args:
+            queries: Query texts
+            top_k: Number of relevant chunks to retrieve per query
+
+        Returns:
+            One concatenated context string per query, in input order
+        """
+        try:
+            if not queries:
+                return []
+
+            query_embeddings = self.embeddings.embed_documents(queries)
+            batched_results = pinecone_service.similarity_search_batch(
+                query_embeddings=query_embeddings,
+                top_k=top_k
+            )
+
+            contexts = [
+                "\n\n".join(_texts_from_matches(similar_docs))
+                for similar_docs in batched_results
+            ]
+
+            logger.info(f"Retrieved context for {len(queries)} queries")
+            return contexts
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve batched context: {str(e)}")
+            return ["" for _ in queries]
+
     def analyze_compliance(self, document_text: str) -> Dict[str, Any]:
         """
         Analyze document for compliance issues using RAG
@@ -168,18 +252,18 @@ class RAGService:
             # Retrieve relevant context
             context = self.retrieve_relevant_context(document_text)
             
-            # Run compliance analysis
-            result = self.compliance_chain.run(
+            # Run compliance analysis on the pre-built prompt directly
+            result = self.llm.predict(_COMPLIANCE_TEMPLATE.format(
                 document_text=document_text,
                 context=context
-            )
+            ))
             
             # Parse JSON response
             try:
-                analysis = json.loads(result.strip())
+                analysis = orjson.loads(result.strip())
                 logger.info("Compliance analysis completed successfully")
                 return analysis
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 # Fallback parsing if JSON is malformed
                 logger.warning("Failed to parse JSON response, using fallback")
                 return self._parse_fallback_response(result)
@@ -206,17 +290,17 @@ class RAGService:
         """
         try:
             # Extract compliance status
-            status_match = re.search(r'compliance_status.*?["\'](\w+)["\']', response, re.IGNORECASE)
+            status_match = _RE_STATUS.search(response)
             status = status_match.group(1) if status_match else "needs_review"
-            
+
             # Extract confidence score
-            confidence_match = re.search(r'confidence_score.*?(\d+\.?\d*)', response)
+            confidence_match = _RE_CONFIDENCE.search(response)
             confidence = float(confidence_match.group(1)) if confidence_match else 0.5
-            
+
             # Extract lists (simplified approach)
-            flagged_clauses = re.findall(r'"([^"]*clause[^"]*)"', response, re.IGNORECASE)
-            recommendations = re.findall(r'"([^"]*recommend[^"]*)"', response, re.IGNORECASE)
-            risk_factors = re.findall(r'"([^"]*risk[^"]*)"', response, re.IGNORECASE)
+            flagged_clauses = _RE_CLAUSES.findall(response)
+            recommendations = _RE_RECOMMENDATIONS.findall(response)
+            risk_factors = _RE_RISKS.findall(response)
             
             return {
                 "compliance_status": status,
@@ -235,7 +319,69 @@ class RAGService:
                 "risk_factors": ["Analysis parsing error"]
             }
     
-    def store_document(self, document_text: str, document_id: str, 
+    def store_documents(self, documents: List[Dict[str, Any]]) -> bool:
+        """
+        Process and store a batch of documents in one embedding/upsert pass
+
+        Splitting, embedding and upserting happen once for the whole batch,
+        so per-document network latency is amortized across all of them.
+
+        Args:
+            documents: List of dicts with document_text, document_id and
+                optional metadata
+
+        Returns:
+            Success status for the batch
+        """
+        try:
+            all_chunks = []
+            for doc in documents:
+                base_metadata = doc.get("metadata") or {}
+                chunks = self.text_splitter.split_text(doc["document_text"])
+                for i, chunk in enumerate(chunks):
+                    all_chunks.append({
+                        "id": f"{doc['document_id']}_chunk_{i}",
+                        "text": chunk,
+                        "metadata": {
+                            "document_id": doc["document_id"],
+                            "chunk_index": i,
+                            "text_length": len(chunk),
+                            **base_metadata
+                        }
+                    })
+
+            if not all_chunks:
+                logger.error("No chunks processed from document batch")
+                return False
+
+            # Persist the texts once, content-addressed, and carry only the
+            # hash in Pinecone metadata instead of the full chunk text
+            hashes = chunk_store.put_many([chunk["text"] for chunk in all_chunks])
+            for chunk, text_hash in zip(all_chunks, hashes):
+                chunk["metadata"]["text_hash"] = text_hash
+
+            # One embeddings request covers every chunk in the batch
+            embeddings = self.embeddings.embed_documents(
+                [chunk["text"] for chunk in all_chunks]
+            )
+            for chunk, embedding in zip(all_chunks, embeddings):
+                chunk["embedding"] = embedding
+
+            success = pinecone_service.upsert_documents(all_chunks)
+
+            if success:
+                logger.info(f"Successfully stored batch of {len(documents)} documents "
+                            f"({len(all_chunks)} chunks)")
+            else:
+                logger.error(f"Failed to store batch of {len(documents)} documents")
+
+            return success
+
+        except Exception as e:
+            logger.error(f"Failed to store document batch: {str(e)}")
+            return False
+
+    def store_document(self, document_text: str, document_id: str,
                       metadata: Optional[Dict] = None) -> bool:
         """
         Process and store document in vector database
@@ -256,13 +402,17 @@ class RAGService:
                 logger.error("No chunks processed from document")
                 return False
             
+            # Persist chunk texts in the content-addressed store; Pinecone
+            # metadata carries the hash rather than duplicating the text
+            hashes = chunk_store.put_many([chunk["text"] for chunk in chunks])
+
             # Add document metadata to chunks
             base_metadata = metadata or {}
-            for chunk in chunks:
+            for chunk, text_hash in zip(chunks, hashes):
                 chunk["id"] = f"{document_id}_{chunk['id']}"
                 chunk["metadata"].update({
                     "document_id": document_id,
-                    "text": chunk["text"],
+                    "text_hash": text_hash,
                     **base_metadata
                 })
             
